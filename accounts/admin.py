@@ -4,7 +4,7 @@ from django.contrib.auth.models import Group
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 from .forms import UserAdminCreationForm, UserAdminChangeForm
-from .models import EmailActivation
+from .models import EmailActivation, LeaderboardEntry, OutboundEmail
 
 
 User = get_user_model()
@@ -45,11 +45,43 @@ admin.site.register(User, UserAdmin)
 admin.site.unregister(Group)
 
 
+def send_activation_emails(modeladmin, request, queryset):
+    queued = queryset.send_activations()
+    modeladmin.message_user(request, 'Queued {count} activation email(s).'.format(count=queued))
+
+send_activation_emails.short_description = 'Send activation emails'
+
+
 class EmailActivationAdmin(admin.ModelAdmin):
     search_fields = ['email']   # Search guest users by email in admin panel
+    actions = [send_activation_emails]
 
     class Meta:
         model = EmailActivation
 
 
 admin.site.register(EmailActivation, EmailActivationAdmin)
+
+
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ['rank', 'user', 'score', 'total_time']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'score', 'total_time', 'rank']
+
+    class Meta:
+        model = LeaderboardEntry
+
+
+admin.site.register(LeaderboardEntry, LeaderboardEntryAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt', 'sent']
+    list_filter = ['status']
+    search_fields = ['recipients', 'subject']
+
+    class Meta:
+        model = OutboundEmail
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the leaderboard from the users\' scores, e.g. after scores were edited in the admin.'
+
+    def handle(self, *args, **options):
+        LeaderboardEntry.objects.rebuild()
+        self.stdout.write('Ranked {count} user(s)'.format(count=LeaderboardEntry.objects.count()))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued emails (activation links, contact messages) in batches over one SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per SMTP connection')
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of exiting when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when there is nothing to send')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = OutboundEmail.objects.send_due(options['batch_size'])
+            if sent or failed:
+                self.stdout.write('Sent {sent} email(s), {failed} failed'.format(sent=sent, failed=failed))
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['poll_interval'])
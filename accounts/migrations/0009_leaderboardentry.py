@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:32
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_leaderboard(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    LeaderboardEntry = apps.get_model('accounts', 'LeaderboardEntry')
+    users = User.objects.order_by('-score', 'total_time', 'pk').values_list('pk', 'score', 'total_time')
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(user_id=pk, score=score, total_time=total_time, rank=rank)
+        for rank, (pk, score, total_time) in enumerate(users.iterator(), 1)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_auto_20180425_1401'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('total_time', models.IntegerField(default=0)),
+                ('rank', models.PositiveIntegerField(db_index=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['-score', 'total_time', 'user'], name='accounts_le_score_bb9654_idx'),
+        ),
+        migrations.RunPython(build_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailactivation',
+            name='key',
+            field=models.CharField(blank=True, db_index=True, max_length=120, null=True),
+        ),
+    ]
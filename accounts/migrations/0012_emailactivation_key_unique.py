@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:47
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def clear_duplicate_keys(apps, schema_editor):
+    """ Empty keys become NULL, of keys that were generated twice only the newest activation keeps its key """
+    EmailActivation = apps.get_model('accounts', 'EmailActivation')
+    EmailActivation.objects.filter(key='').update(key=None)
+    duplicates = (EmailActivation.objects.exclude(key=None).values('key')
+                  .annotate(count=Count('id')).filter(count__gt=1).values_list('key', flat=True))
+    for key in list(duplicates):
+        newest = EmailActivation.objects.filter(key=key).latest('timestamp')
+        EmailActivation.objects.filter(key=key).exclude(pk=newest.pk).update(key=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='emailactivation',
+            name='key',
+            field=models.CharField(blank=True, max_length=120, null=True, unique=True),
+        ),
+    ]
@@ -1,20 +1,39 @@
 from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Q
-from django.db.models.signals import pre_save, post_save
+from django.db import connection, models, transaction
+from django.db.models import F, Max, Q
+from django.db.models.signals import post_delete, pre_save, post_save
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.core.urlresolvers import reverse
 from django.template.loader import get_template
 
+from accounts.signals import rank_changed
+from judge.cache import invalidate, user_namespace
 from judge.utils import unique_key_generator
 
 
 DEFAULT_ACTIVATION_DAYS = getattr(settings, 'DEFAULT_ACTIVATION_DAYS', 7)
 
+ACTIVATION_EMAIL_SUBJECT = 'Morphosis Code Warrior - Verify your Account'
+
+LEADERBOARD_PAGE_SIZE = getattr(settings, 'LEADERBOARD_PAGE_SIZE', 50)
+
+# A failed email is retried after EMAIL_RETRY_DELAY seconds, the delay doubles with every attempt up to
+# EMAIL_MAX_RETRY_DELAY. It is given up after EMAIL_MAX_ATTEMPTS attempts.
+EMAIL_MAX_ATTEMPTS = getattr(settings, 'EMAIL_MAX_ATTEMPTS', 8)
+EMAIL_RETRY_DELAY = getattr(settings, 'EMAIL_RETRY_DELAY', 60)
+EMAIL_MAX_RETRY_DELAY = getattr(settings, 'EMAIL_MAX_RETRY_DELAY', 3600)
+EMAIL_SEND_TIMEOUT = 300  # seconds a claimed email is reserved for the sender that claimed it
+
+OUTBOUND_EMAIL_STATUS_TYPES = (
+    ('queued', 'Queued'),  # Waiting to be sent, or to be retried
+    ('sent', 'Sent'),
+    ('failed', 'Failed'),  # Given up after EMAIL_MAX_ATTEMPTS attempts
+)
+
 
 class UserManager(BaseUserManager):
 
@@ -60,6 +79,22 @@ class UserManager(BaseUserManager):
         )
         return user
 
+    def add_score(self, user, score, total_time):
+        """
+        Adds `score` and `total_time` (seconds) to the user's totals in a single UPDATE and moves the user on the
+        leaderboard in the same transaction. Concurrent gradings cannot lose each other's updates because the
+        addition is done by the database. The new totals are set on `user`.
+        """
+        with transaction.atomic(using=self._db):
+            self.filter(pk=user.pk).update(
+                score=F('score') + int(score),
+                total_time=F('total_time') + int(total_time),
+                updated=timezone.now()
+            )
+            user.score, user.total_time = self.filter(pk=user.pk).values_list('score', 'total_time').get()
+            LeaderboardEntry.objects.update_entry(user)
+        return user
+
 
 class User(AbstractBaseUser):
     username = models.CharField(unique=True, max_length=120)
@@ -101,13 +136,11 @@ class User(AbstractBaseUser):
         return True
 
     def increment_score(self, value):
-        self.score += int(value)
-        self.save()
+        User.objects.add_score(self, value, 0)
         return self.score
 
     def increment_time(self, value):
-        self.total_time += int(value)
-        self.save()
+        User.objects.add_score(self, 0, value)
         return self.total_time
     
     @property
@@ -123,8 +156,282 @@ class User(AbstractBaseUser):
         return self.admin
 
 
+class LeaderboardEntryQuerySet(models.query.QuerySet):
+
+    def ranked(self):
+        # Only the username is loaded from the user, pages are cached and should not carry password hashes
+        return self.select_related('user').only('rank', 'score', 'total_time', 'user__username').order_by('rank')
+
+    def page(self, after=0, size=LEADERBOARD_PAGE_SIZE):
+        """ Returns the `size` entries ranked after `after`. Ranks have no gaps, so this is an index range scan. """
+        return self.ranked().filter(rank__gt=after)[:size]
+
+    def first_behind(self, score, total_time, user_id):
+        """
+        Returns the first entry ranked below a user with the given score and time, other than the user's own. The
+        three ranges behind the user are searched in leaderboard order, each one is a single index lookup.
+        """
+        ranges = [
+            Q(score=score, total_time=total_time, user_id__gt=user_id),
+            Q(score=score, total_time__gt=total_time),
+            Q(score__lt=score),
+        ]
+        for behind in ranges:
+            entry = self.filter(behind).exclude(user_id=user_id).order_by('-score', 'total_time', 'user_id').first()
+            if entry is not None:
+                return entry
+        return None
+
+
+class LeaderboardEntryManager(models.Manager):
+
+    def get_queryset(self):
+        return LeaderboardEntryQuerySet(self.model, using=self._db)
+
+    def page(self, after=0, size=LEADERBOARD_PAGE_SIZE):
+        return self.get_queryset().page(after, size)
+
+    def lock(self):
+        """ Serialises rank changes until the end of the transaction. SQLite locks the whole database on write. """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE'.format(table=self.model._meta.db_table))
+
+    def update_entry(self, user):
+        """
+        Moves the user's entry to the place of the user's current score and time. Only the entries between the
+        old and the new place are shifted by one, the rest of the ranking is untouched.
+        """
+        with transaction.atomic(using=self._db):
+            self.lock()
+            entry = self.filter(user=user).first()
+            if entry is not None and entry.score == user.score and entry.total_time == user.total_time:
+                return entry
+            max_rank = self.aggregate(max_rank=Max('rank'))['max_rank'] or 0
+            created = entry is None
+            if created:
+                entry = self.model(user=user)
+                old_rank = max_rank + 1  # a new entry starts below everyone
+                last_rank = max_rank + 1
+            else:
+                old_rank = entry.rank
+                last_rank = max_rank
+
+            # The first entry behind the new place decides the new rank, the ranks after the old place move up by one
+            first_behind = self.get_queryset().first_behind(user.score, user.total_time, user.pk)
+            if first_behind is None:
+                rank = last_rank
+            elif first_behind.rank < old_rank:
+                rank = first_behind.rank
+            else:
+                rank = first_behind.rank - 1
+
+            if rank < old_rank:
+                self.filter(rank__gte=rank, rank__lt=old_rank).update(rank=F('rank') + 1)
+            elif rank > old_rank:
+                self.filter(rank__gt=old_rank, rank__lte=rank).update(rank=F('rank') - 1)
+            entry.score = user.score
+            entry.total_time = user.total_time
+            entry.rank = rank
+            entry.save()
+            rank_changed.send(sender=self.model, entry=entry, old_rank=None if created else old_rank)
+            return entry
+
+    def close_gap(self, rank):
+        """ Moves the entries ranked after a deleted entry up by one, so that the ranks stay without gaps """
+        with transaction.atomic(using=self._db):
+            self.lock()
+            self.filter(rank__gt=rank).update(rank=F('rank') - 1)
+
+    def rebuild(self):
+        """ Recomputes the whole leaderboard from the users' scores """
+        with transaction.atomic(using=self._db):
+            self.lock()
+            self.all().delete()
+            users = User.objects.order_by('-score', 'total_time', 'pk').values_list('pk', 'score', 'total_time')
+            self.bulk_create([
+                self.model(user_id=pk, score=score, total_time=total_time, rank=rank)
+                for rank, (pk, score, total_time) in enumerate(users.iterator(), 1)
+            ], batch_size=1000)
+        invalidate('leaderboard')
+
+
+class LeaderboardEntry(models.Model):
+    """ A user's place on the leaderboard, kept in step with User.score and User.total_time """
+    user = models.OneToOneField(User, related_name='leaderboard_entry')
+    score = models.IntegerField(default=0)
+    total_time = models.IntegerField(default=0)
+    rank = models.PositiveIntegerField(db_index=True)
+
+    objects = LeaderboardEntryManager()
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['-score', 'total_time', 'user']),
+        ]
+        verbose_name_plural = 'leaderboard entries'
+
+    def __str__(self):
+        return '{rank}. {user}'.format(rank=self.rank, user=self.user)
+
+    @property
+    def page_start(self):
+        """ Value of `after` for the leaderboard page that shows this entry """
+        return (self.rank - 1) // LEADERBOARD_PAGE_SIZE * LEADERBOARD_PAGE_SIZE
+
+
+class OutboundEmailQuerySet(models.query.QuerySet):
+
+    def due(self):
+        return self.filter(status='queued', next_attempt__lte=timezone.now())
+
+
+class OutboundEmailManager(models.Manager):
+
+    def get_queryset(self):
+        return OutboundEmailQuerySet(self.model, using=self._db)
+
+    def due(self):
+        return self.get_queryset().due()
+
+    def build(self, subject, message, from_email, recipient_list, html_message=None):
+        """ Returns an unsaved email, takes the same arguments as send_mail() """
+        return self.model(
+            subject=subject,
+            body=message,
+            html_body=html_message or '',
+            from_email=from_email,
+            recipients=','.join(recipient_list)
+        )
+
+    def enqueue(self, subject, message, from_email, recipient_list, html_message=None):
+        """ Stores an email for the send_queued_mail command, takes the same arguments as send_mail() """
+        email = self.build(subject, message, from_email, recipient_list, html_message=html_message)
+        email.save(force_insert=True, using=self._db)
+        return email
+
+    def claim_due(self, batch_size):
+        """
+        Returns up to `batch_size` emails that are due. Their next attempt is moved into the future by a conditional
+        update, so that senders running at the same time do not send the same email twice.
+        """
+        claimed = []
+        for email in self.due().order_by('next_attempt')[:batch_size]:
+            lease = timezone.now() + timedelta(seconds=EMAIL_SEND_TIMEOUT)
+            if self.filter(pk=email.pk, next_attempt=email.next_attempt).update(next_attempt=lease):
+                claimed.append(email)
+        return claimed
+
+    def send_due(self, batch_size=100):
+        """ Sends the due emails over one SMTP connection, returns the number of emails sent and failed """
+        emails = self.claim_due(batch_size)
+        if not emails:
+            return 0, 0
+        sent = failed = 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            for email in emails:
+                email.failed(e)
+            return 0, len(emails)
+        try:
+            for email in emails:
+                try:
+                    email.message(connection).send()
+                except Exception as e:
+                    email.failed(e)
+                    failed += 1
+                else:
+                    email.delivered()
+                    sent += 1
+        finally:
+            connection.close()
+        return sent, failed
+
+
+class OutboundEmail(models.Model):
+    """ Email waiting to be sent by the send_queued_mail command, so that requests never wait for the SMTP server """
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.TextField()  # comma separated
+    status = models.CharField(max_length=10, choices=OUTBOUND_EMAIL_STATUS_TYPES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboundEmailManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+    def __str__(self):
+        return '{subject} - {recipients}'.format(subject=self.subject, recipients=self.recipients)
+
+    def message(self, connection=None):
+        message = EmailMultiAlternatives(
+            self.subject, self.body, self.from_email, self.recipients.split(','), connection=connection
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+    def delivered(self):
+        self.status = 'sent'
+        self.attempts += 1
+        self.sent = timezone.now()
+        self.save()
+
+    def failed(self, error):
+        """ Schedules the next attempt with exponential backoff, or gives up """
+        self.attempts += 1
+        self.last_error = repr(error)
+        if self.attempts >= EMAIL_MAX_ATTEMPTS:
+            self.status = 'failed'
+        else:
+            delay = min(EMAIL_RETRY_DELAY * 2 ** (self.attempts - 1), EMAIL_MAX_RETRY_DELAY)
+            self.next_attempt = timezone.now() + timedelta(seconds=delay)
+        self.save()
+
+
 class EmailActivationQuerySet(models.query.QuerySet):
 
+    def sendable(self):
+        """ Returns the activations whose link still works, expired ones would only get a dead link """
+        return self.confirmable().filter(key__isnull=False)
+
+    def send_activations(self, batch_size=500):
+        """
+        Queues the activation emails of all sendable activations in the queryset. The templates are loaded once and
+        every email is rendered from the same compiled templates, the emails are inserted in batches.
+        """
+        txt_template = get_template('registration/emails/verify.txt')
+        html_template = get_template('registration/emails/verify.html')
+        emails = []
+        queued = 0
+        for activation in self.sendable().iterator():
+            context = activation.get_email_context()
+            emails.append(OutboundEmail.objects.build(
+                ACTIVATION_EMAIL_SUBJECT,
+                txt_template.render(context),
+                settings.DEFAULT_FROM_EMAIL,
+                [activation.email],
+                html_message=html_template.render(context)
+            ))
+            if len(emails) >= batch_size:
+                OutboundEmail.objects.bulk_create(emails)
+                queued += len(emails)
+                emails = []
+        OutboundEmail.objects.bulk_create(emails)
+        return queued + len(emails)
+
     def confirmable(self):
         """
         Returns those emails which can be confirmed i.e. which are not activated and expired
@@ -144,6 +451,9 @@ class EmailActivationManager(models.Manager):
     
     def confirmable(self):
         return self.get_queryset().confirmable()
+
+    def send_activations(self, batch_size=500):
+        return self.get_queryset().send_activations(batch_size)
     
     def email_exists(self, email):
         """
@@ -159,7 +469,7 @@ class EmailActivationManager(models.Manager):
 class EmailActivation(models.Model):
     user = models.ForeignKey(User)
     email = models.EmailField()
-    key = models.CharField(max_length=120, blank=True, null=True)  # activation key
+    key = models.CharField(max_length=120, blank=True, null=True, unique=True)  # activation key
     activated = models.BooleanField(default=False)
     forced_expire = models.BooleanField(default=False)  # link expired manually
     expires = models.IntegerField(default=7)  # automatic expire (after days)
@@ -187,30 +497,33 @@ class EmailActivation(models.Model):
             return True
         return False
     
+    def get_email_context(self):
+        base_url = getattr(settings, 'HOST_SCHEME') + getattr(settings, 'BASE_URL')
+        key_path = reverse('account:email-activate', kwargs={'key': self.key})
+        path = '{base}{path}'.format(base=base_url, path=key_path)
+        return {
+            'path': path,
+            'email': self.email
+        }
+
     def send_activation(self):
         if not self.activated and not self.forced_expire:
             if self.key:
-                base_url = getattr(settings, 'HOST_SCHEME') + getattr(settings, 'BASE_URL')
-                key_path = reverse('account:email-activate', kwargs={'key': self.key})
-                path = '{base}{path}'.format(base=base_url, path=key_path)
-                context = {
-                    'path': path,
-                    'email': self.email
-                }
+                context = self.get_email_context()
                 txt_ = get_template('registration/emails/verify.txt').render(context)
                 html_ = get_template('registration/emails/verify.html').render(context)
-                subject = 'Morphosis Code Warrior - Verify your Account'
+                subject = ACTIVATION_EMAIL_SUBJECT
                 from_email = settings.DEFAULT_FROM_EMAIL
                 recipient_list = [self.email]
-                sent_mail = send_mail(
+                # Sent by the send_queued_mail command, the registration request does not wait for the SMTP server
+                queued_mail = OutboundEmail.objects.enqueue(
                     subject,
                     txt_,  # If content_type is text/plain
                     from_email,
                     recipient_list,
-                    html_message=html_,  # If content_type is text/html
-                    fail_silently=False  # If false, then an email will be sent if error occurs while sending the email
+                    html_message=html_  # If content_type is text/html
                 )
-                return sent_mail
+                return queued_mail
         return False
 
 
@@ -222,8 +535,30 @@ pre_save.connect(pre_save_email_activation_receiver, sender=EmailActivation)
 
 
 def post_save_user_create_receiver(sender, instance, created, *args, **kwargs):
-    if created:
+    if created and not kwargs.get('raw'):  # users loaded with loaddata are not new sign-ups
         email_obj = EmailActivation.objects.create(user=instance, email=instance.email)
         email_obj.send_activation()
 
 post_save.connect(post_save_user_create_receiver, sender=User)
+
+
+def post_save_user_leaderboard_receiver(sender, instance, created, *args, **kwargs):
+    if created and not kwargs.get('raw'):  # loaddata brings the user's entry along
+        LeaderboardEntry.objects.update_entry(instance)
+        invalidate('leaderboard')
+
+post_save.connect(post_save_user_leaderboard_receiver, sender=User)
+
+
+def post_delete_leaderboard_entry_receiver(sender, instance, *args, **kwargs):
+    # Also sent when the entry is deleted along with its user
+    LeaderboardEntry.objects.close_gap(instance.rank)
+    invalidate('leaderboard')
+
+post_delete.connect(post_delete_leaderboard_entry_receiver, sender=LeaderboardEntry)
+
+
+def post_save_user_cache_receiver(sender, instance, *args, **kwargs):
+    invalidate(user_namespace(instance.username))
+
+post_save.connect(post_save_user_cache_receiver, sender=User)
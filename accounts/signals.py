@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Sent by LeaderboardEntry.objects.update_entry() inside its transaction when a user's rank or score changed.
+# old_rank is None for a new entry.
+rank_changed = Signal(providing_args=['entry', 'old_rank'])
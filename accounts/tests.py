@@ -1,3 +1,263 @@
-from django.test import TestCase
+import random
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from judge.cache import get_version
+from judge.testcases import QueryPlanTestCase
+
+from .models import (
+    DEFAULT_ACTIVATION_DAYS, EMAIL_MAX_ATTEMPTS, EMAIL_MAX_RETRY_DELAY, EMAIL_RETRY_DELAY, EmailActivation,
+    LeaderboardEntry, OutboundEmail, User
+)
+
+
+class QueryPlanTests(QueryPlanTestCase):
+
+    def test_leaderboard_page(self):
+        self.assertUsesIndex(LeaderboardEntry.objects.page(100), ordered=True)
+
+    def test_leaderboard_place(self):
+        # The ranges searched by LeaderboardEntryQuerySet.first_behind()
+        ranges = [
+            Q(score=50, total_time=120, user_id__gt=7),
+            Q(score=50, total_time__gt=120),
+            Q(score__lt=50),
+        ]
+        for behind in ranges:
+            qs = LeaderboardEntry.objects.filter(behind).exclude(user_id=7).order_by('-score', 'total_time', 'user_id')
+            self.assertUsesIndex(qs[:1], ordered=True)
+
+    def test_activation_key(self):
+        self.assertUsesIndex(EmailActivation.objects.filter(key='abc'))
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user('user{0}'.format(i), 'user{0}@example.com'.format(i), 'secret')
+                      for i in range(12)]
+
+    def set_score(self, user, score, total_time):
+        User.objects.filter(pk=user.pk).update(score=score, total_time=total_time)
+        user.score, user.total_time = score, total_time
+        return LeaderboardEntry.objects.update_entry(user)
+
+    def assertRanking(self):
+        """ Ranks are 1..n without gaps, in the order of score, then time, then user id """
+        expected = User.objects.order_by('-score', 'total_time', 'pk').values_list('pk', flat=True)
+        ranking = LeaderboardEntry.objects.order_by('rank').values_list('rank', 'user_id')
+        self.assertEqual(list(ranking), list(enumerate(expected, 1)))
+
+    def test_new_users_are_ranked_last(self):
+        self.assertRanking()
+
+    def test_update_entry_keeps_ranks_contiguous(self):
+        generator = random.Random(7)
+        for step in range(150):
+            user = generator.choice(self.users)
+            # Few distinct scores and times, so that ties are frequent
+            self.set_score(user, generator.randint(0, 4) * 10, generator.randint(0, 3))
+            self.assertRanking()
+
+    def test_first_behind(self):
+        first, second, third = self.users[:3]
+        self.set_score(first, 30, 100)
+        self.set_score(second, 30, 200)
+        self.set_score(third, 20, 50)
+        entries = LeaderboardEntry.objects.all()
+        self.assertEqual(entries.first_behind(30, 100, first.pk).user_id, second.pk)
+        self.assertEqual(entries.first_behind(30, 150, 0).user_id, second.pk)
+        self.assertEqual(entries.first_behind(30, 200, second.pk).user_id, third.pk)
+        # Equal score and time are ordered by user id
+        self.assertEqual(entries.first_behind(30, 100, 0).user_id, first.pk)
+
+    def test_page(self):
+        ranks = [entry.rank for entry in LeaderboardEntry.objects.page(after=5, size=4)]
+        self.assertEqual(ranks, [6, 7, 8, 9])
+
+    def test_rebuild(self):
+        for index, user in enumerate(self.users):
+            User.objects.filter(pk=user.pk).update(score=index % 3 * 10, total_time=index % 4)
+        LeaderboardEntry.objects.rebuild()
+        self.assertRanking()
+
+    def test_deleted_user_leaves_no_gap(self):
+        for index, user in enumerate(self.users):
+            self.set_score(user, 100 - index, 0)
+        version = get_version('leaderboard')
+        self.users[3].delete()
+        self.assertRanking()
+        self.assertNotEqual(get_version('leaderboard'), version)
+        self.assertEqual([entry.rank for entry in LeaderboardEntry.objects.page(after=2, size=2)], [3, 4])
+
+    def test_only_signed_in_users_stream_rank_changes(self):
+        events_url = reverse('leaderboard-events')
+        response = self.client.get(reverse('leaderboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, events_url)
+
+        self.client.force_login(self.users[0])
+        self.assertContains(self.client.get(reverse('leaderboard')), events_url)
+
+    def test_leaderboard_cache_is_invalidated(self):
+        version = get_version('leaderboard')
+        User.objects.create_user('newcomer', 'newcomer@example.com', 'secret')
+        self.assertNotEqual(get_version('leaderboard'), version)
+
+        version = get_version('leaderboard')
+        LeaderboardEntry.objects.rebuild()
+        self.assertNotEqual(get_version('leaderboard'), version)
+
+
+class AddScoreTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+
+    def test_updates_of_stale_instances_are_not_lost(self):
+        # Two graders holding their own copy of the user
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        User.objects.add_score(first, 20, 100)
+        User.objects.add_score(second, 30, 50)
+        self.assertEqual((second.score, second.total_time), (50, 150))
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.score, self.user.total_time), (50, 150))
+
+    def test_moves_the_leaderboard_entry(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        User.objects.add_score(other, 10, 0)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user).rank, 2)
+        User.objects.add_score(self.user, 20, 0)
+        entry = LeaderboardEntry.objects.get(user=self.user)
+        self.assertEqual((entry.rank, entry.score), (1, 20))
+
+    def test_increments(self):
+        self.assertEqual(self.user.increment_score(10), 10)
+        self.assertEqual(self.user.increment_time(60), 60)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.score, self.user.total_time), (10, 60))
+
+
+class FailingEmailBackend(locmem.EmailBackend):
+    """ Keeps the sent emails in mail.outbox like the locmem backend, fails for the recipients in `failing` """
+    failing = set()
+    opened = True
+
+    def open(self):
+        if not self.opened:
+            raise ConnectionRefusedError('SMTP server is down')
+        return super(FailingEmailBackend, self).open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.failing.intersection(message.to):
+                raise SMTPRecipientsRefused({recipient: (550, b'No such user') for recipient in message.to})
+        return super(FailingEmailBackend, self).send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='accounts.tests.FailingEmailBackend')
+class OutboundEmailTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, FailingEmailBackend, 'failing', set())
+        self.addCleanup(setattr, FailingEmailBackend, 'opened', True)
+
+    def enqueue(self, recipient):
+        return OutboundEmail.objects.enqueue('Subject', 'Body', 'contest@example.com', [recipient])
+
+    def test_claimed_emails_are_leased(self):
+        first, second = self.enqueue('alice@example.com'), self.enqueue('bob@example.com')
+        self.assertEqual([email.pk for email in OutboundEmail.objects.claim_due(10)], [first.pk, second.pk])
+        # Another sender finds nothing due until the lease runs out
+        self.assertEqual(OutboundEmail.objects.claim_due(10), [])
+        OutboundEmail.objects.filter(pk=first.pk).update(
+            next_attempt=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual([email.pk for email in OutboundEmail.objects.claim_due(10)], [first.pk])
+
+    def test_send_due(self):
+        self.enqueue('alice@example.com')
+        self.enqueue('bob@example.com')
+        FailingEmailBackend.failing = {'bob@example.com'}
+        self.assertEqual(OutboundEmail.objects.send_due(), (1, 1))
+        self.assertEqual([message.to for message in mail.outbox], [['alice@example.com']])
+        self.assertEqual(OutboundEmail.objects.get(recipients='alice@example.com').status, 'sent')
+
+        bob = OutboundEmail.objects.get(recipients='bob@example.com')
+        self.assertEqual((bob.status, bob.attempts), ('queued', 1))
+        self.assertIn('SMTPRecipientsRefused', bob.last_error)
+
+    def test_retries_back_off_exponentially_then_give_up(self):
+        email = self.enqueue('bob@example.com')
+        delays = []
+        for _ in range(EMAIL_MAX_ATTEMPTS - 1):
+            before = timezone.now()
+            email.failed(Exception('refused'))
+            delays.append(round((email.next_attempt - before).total_seconds()))
+            self.assertEqual(email.status, 'queued')
+        expected = [min(EMAIL_RETRY_DELAY * 2 ** attempt, EMAIL_MAX_RETRY_DELAY) for attempt in range(len(delays))]
+        self.assertEqual(delays, expected)
+
+        email.failed(Exception('refused'))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', EMAIL_MAX_ATTEMPTS))
+        self.assertEqual(OutboundEmail.objects.due().count(), 0)
+
+    def test_connection_failure_fails_the_whole_batch(self):
+        self.enqueue('alice@example.com')
+        self.enqueue('bob@example.com')
+        FailingEmailBackend.opened = False
+        self.assertEqual(OutboundEmail.objects.send_due(), (0, 2))
+        self.assertEqual(mail.outbox, [])
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('queued', 1))
+            self.assertIn('SMTP server is down', email.last_error)
+            self.assertGreater(email.next_attempt, timezone.now())
+
+
+class ActivationEmailTests(TestCase):
+
+    def test_registration_queues_the_activation_email(self):
+        User.objects.create_user('alice', 'alice@example.com', password='secret')
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, 'alice@example.com')
+        self.assertIn(EmailActivation.objects.get().key, email.body)
+
+    def test_send_activations_renders_one_email_per_activation(self):
+        for name in ['alice', 'bob', 'carol']:
+            User.objects.create_user(name, name + '@example.com', password='secret')
+        EmailActivation.objects.filter(email='carol@example.com').update(activated=True)
+        OutboundEmail.objects.all().delete()
+
+        self.assertEqual(EmailActivation.objects.send_activations(batch_size=1), 2)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipients', flat=True)),
+            ['alice@example.com', 'bob@example.com']
+        )
+        for activation in EmailActivation.objects.filter(activated=False):
+            self.assertIn(activation.key, OutboundEmail.objects.get(recipients=activation.email).html_body)
+
+    def test_send_activations_skips_expired_activations(self):
+        for name in ['alice', 'bob']:
+            User.objects.create_user(name, name + '@example.com', password='secret')
+        EmailActivation.objects.filter(email='bob@example.com').update(
+            timestamp=timezone.now() - timedelta(days=DEFAULT_ACTIVATION_DAYS + 1)
+        )
+        OutboundEmail.objects.all().delete()
+
+        self.assertEqual(EmailActivation.objects.send_activations(), 1)
+        self.assertEqual(OutboundEmail.objects.get().recipients, 'alice@example.com')
+
+    def test_activation_link_ignores_case(self):
+        User.objects.create_user('alice', 'alice@example.com', password='secret')
+        activation = EmailActivation.objects.get()
+        self.assertEqual(activation.key, activation.key.lower())
+        self.client.get(reverse('account:email-activate', kwargs={'key': activation.key.upper()}))
+        self.assertTrue(EmailActivation.objects.get().activated)
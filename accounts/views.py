@@ -8,7 +8,8 @@ from django.utils.safestring import mark_safe
 from django.core.urlresolvers import reverse
 
 from .forms import LoginForm, RegisterForm, ReactivateEmailForm
-from .models import EmailActivation
+from .models import EmailActivation, LeaderboardEntry, LEADERBOARD_PAGE_SIZE
+from judge.cache import get_or_set, user_namespace
 from judge.mixins import LoginRequiredMixin, AnonymousRequiredMixin, RequestFormAttachMixin, NextUrlMixin
 
 from grader.util import passkey
@@ -21,16 +22,55 @@ class ProfileView(LoginRequiredMixin, DetailView):
 
     def get_object(self, *args, **kwargs):
         username = self.kwargs.get('username')
-        instance = User.objects.filter(username=username).first()
+        instance = get_or_set(user_namespace(username), ['profile'], lambda: User.objects.filter(
+            username=username
+        ).only('username', 'full_name', 'email', 'score').first())
         if instance is None:
             raise Http404('User not found')
         return instance
 
 
 class LeaderBoardView(ListView):
-    queryset = User.objects.all()
+    """ One page of the precomputed ranking, `?after=<rank>` selects the page (keyset pagination on rank) """
     template_name = 'accounts/leaderboard.html'
 
+    def get_after(self):
+        try:
+            return max(0, int(self.request.GET.get('after', 0)))
+        except ValueError:
+            return 0
+
+    def get_queryset(self):
+        after = self.get_after()
+        return get_or_set('leaderboard', ['page', after], lambda: list(
+            LeaderboardEntry.objects.page(after, LEADERBOARD_PAGE_SIZE + 1)
+        ))
+
+    def get_context_data(self, *args, **kwargs):
+        context = super(LeaderBoardView, self).get_context_data(*args, **kwargs)
+        entries = list(context['object_list'])
+        after = self.get_after()
+        context['object_list'] = entries[:LEADERBOARD_PAGE_SIZE]
+        context['next_after'] = after + LEADERBOARD_PAGE_SIZE if len(entries) > LEADERBOARD_PAGE_SIZE else None
+        context['previous_after'] = max(0, after - LEADERBOARD_PAGE_SIZE) if after > 0 else None
+        context['username'] = self.request.user.username
+        context['after'] = after
+        context['page_size'] = LEADERBOARD_PAGE_SIZE
+        return context
+
+
+class MyRankView(LoginRequiredMixin, View):
+    """ Redirects to the leaderboard page that shows the current user """
+
+    def get(self, request, *args, **kwargs):
+        entry = LeaderboardEntry.objects.filter(user=request.user).first()
+        if entry is None:
+            return redirect('leaderboard')
+        url = '{path}?after={after}#rank-{rank}'.format(
+            path=reverse('leaderboard'), after=entry.page_start, rank=entry.rank
+        )
+        return redirect(url)
+
 class AccountEmailActivateView(FormMixin, View):
     success_url = '/login/'
     form_class = ReactivateEmailForm
@@ -39,7 +79,8 @@ class AccountEmailActivateView(FormMixin, View):
     def get(self, request, key=None, *args, **kwargs):
         self.key = key
         if key is not None:
-            qs = EmailActivation.objects.filter(key__iexact=key)
+            # Keys are generated in lower case, so an exact match is case-insensitive and uses the unique index
+            qs = EmailActivation.objects.filter(key=key.lower())
             confirm_qs = qs.confirmable()
             if confirm_qs.count() == 1:  # Not confirmed but confirmable
                 obj = confirm_qs.first()
@@ -1,6 +1,32 @@
 from django.contrib import admin
 
-from .models import Solution
+from .models import BestScore, Solution
 
 
-admin.site.register(Solution)
+def rejudge_submissions(modeladmin, request, queryset):
+    requeued = queryset.rejudge()
+    modeladmin.message_user(request, 'Requeued {count} failed submission(s).'.format(count=requeued))
+
+rejudge_submissions.short_description = 'Rejudge failed submissions'
+
+
+class SolutionAdmin(admin.ModelAdmin):
+    list_filter = ['status', 'result']
+    actions = [rejudge_submissions]
+
+    class Meta:
+        model = Solution
+
+
+admin.site.register(Solution, SolutionAdmin)
+
+
+class BestScoreAdmin(admin.ModelAdmin):
+    list_display = ['user', 'question', 'best_score', 'best_timestamp', 'attempts']
+    search_fields = ['user__username', 'question__code']
+
+    class Meta:
+        model = BestScore
+
+
+admin.site.register(BestScore, BestScoreAdmin)
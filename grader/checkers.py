@@ -0,0 +1,144 @@
+import math
+import re
+from collections import namedtuple
+
+
+CHUNK_SIZE = 64 * 1024
+
+CHECKER_TYPES = (
+    ('exact', 'Exact'),                      # Byte for byte
+    ('whitespace', 'Ignore whitespace'),     # Same tokens on the same lines, trailing blank lines ignored
+    ('tokens', 'Tokens'),                    # Same tokens, line breaks are ordinary whitespace
+    ('float', 'Floating point tokens'),      # Like tokens, numbers are compared with a tolerance
+)
+
+# Where the contestant's output first differs from the expected output (1-based line and column)
+Mismatch = namedtuple('Mismatch', ['line', 'column', 'message'])
+
+Token = namedtuple('Token', ['value', 'line', 'column'])
+
+NEWLINE = b'\n'
+END = b''  # value of the token that marks the end of a stream
+TOKEN_RE = re.compile(rb'[^\s]+|\n')
+
+
+def _advance(line, column, data):
+    """ Returns the position after reading `data` from (line, column) """
+    newlines = data.count(b'\n')
+    if newlines:
+        return line + newlines, len(data) - data.rfind(b'\n')
+    return line, column + len(data)
+
+
+def compare_exact(answer, expected):
+    line, column = 1, 1
+    while True:
+        a = answer.read(CHUNK_SIZE)
+        e = expected.read(CHUNK_SIZE)
+        if a == e:
+            if not a:
+                return None
+            line, column = _advance(line, column, a)
+            continue
+
+        common = min(len(a), len(e))
+        index = next((i for i in range(common) if a[i] != e[i]), common)
+        line, column = _advance(line, column, a[:index])
+        if index == len(a):
+            return Mismatch(line, column, 'output ended early')
+        if index == len(e):
+            return Mismatch(line, column, 'unexpected extra output')
+        return Mismatch(line, column, 'wrong answer')
+
+
+def tokens(stream, newlines=True):
+    """
+    Yields the whitespace separated tokens of a binary stream with their position, reading it in chunks.
+    With `newlines`, every line break is yielded as a NEWLINE token as well. The last token is END, at the
+    position where the stream ended.
+    """
+    line, column = 1, 1
+    carry = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        buffer = carry + chunk
+        carry = b''
+        position = 0
+        for match in TOKEN_RE.finditer(buffer):
+            if chunk and match.end() == len(buffer) and match.group() != NEWLINE:
+                # The token may continue in the next chunk
+                carry = buffer[match.start():]
+                break
+            line, column = _advance(line, column, buffer[position:match.start()])
+            if match.group() != NEWLINE or newlines:
+                yield Token(match.group(), line, column)
+            line, column = _advance(line, column, match.group())
+            position = match.end()
+        else:
+            line, column = _advance(line, column, buffer[position:])
+        if carry:
+            line, column = _advance(line, column, buffer[position:len(buffer) - len(carry)])
+        if not chunk:
+            yield Token(END, line, column)
+            return
+
+
+def float_equal(tolerance):
+    def equal(a, b):
+        if a == b:
+            return True
+        try:
+            x = float(a)
+            y = float(b)
+        except ValueError:
+            return False
+        if math.isnan(x) or math.isnan(y):
+            return math.isnan(x) and math.isnan(y)
+        return abs(x - y) <= tolerance * max(1.0, abs(x), abs(y))
+    return equal
+
+
+def compare_tokens(answer, expected, newlines=False, equal=None):
+    equal = equal or (lambda a, b: a == b)
+    answer_tokens = tokens(answer, newlines=newlines)
+    expected_tokens = tokens(expected, newlines=newlines)
+    while True:
+        a = next(answer_tokens)
+        e = next(expected_tokens)
+        if a.value == END and e.value == END:
+            return None
+
+        if a.value == END or e.value == END:
+            # Only trailing line breaks may be left on the other side
+            rest, remaining = (expected_tokens, e) if a.value == END else (answer_tokens, a)
+            while remaining.value != END:
+                if remaining.value != NEWLINE:
+                    if a.value == END:
+                        return Mismatch(a.line, a.column, 'output ended early')
+                    return Mismatch(remaining.line, remaining.column, 'unexpected extra output')
+                remaining = next(rest)
+            return None
+
+        if a.value == NEWLINE and e.value != NEWLINE:
+            return Mismatch(a.line, a.column, 'line ended early')
+        if e.value == NEWLINE and a.value != NEWLINE:
+            return Mismatch(a.line, a.column, 'line is too long')
+        if not equal(a.value, e.value):
+            return Mismatch(a.line, a.column, 'wrong answer')
+
+
+def compare(answer_path, expected_path, checker='whitespace', tolerance=1e-6):
+    """
+    Compares the contestant's output with the expected output without loading either into memory.
+    Returns None when they match, otherwise the first Mismatch.
+    """
+    with open(answer_path, 'rb') as answer, open(expected_path, 'rb') as expected:
+        if checker == 'exact':
+            return compare_exact(answer, expected)
+        if checker == 'whitespace':
+            return compare_tokens(answer, expected, newlines=True)
+        if checker == 'tokens':
+            return compare_tokens(answer, expected)
+        if checker == 'float':
+            return compare_tokens(answer, expected, equal=float_equal(tolerance))
+    raise ValueError('Unknown checker: {checker}'.format(checker=checker))
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'code-warrior', 'compile-cache')
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024  # bytes
+
+_compiler_versions = {}
+
+
+def compiler_version(compiler):
+    """ Returns the first line of `<compiler> --version`, looked up once per process """
+    if compiler not in _compiler_versions:
+        try:
+            output = subprocess.check_output([compiler, '--version'], stderr=subprocess.STDOUT)
+            _compiler_versions[compiler] = output.decode('utf-8', 'replace').splitlines()[0]
+        except (OSError, subprocess.CalledProcessError, IndexError):
+            _compiler_versions[compiler] = 'unknown'
+    return _compiler_versions[compiler]
+
+
+def file_hash(path, chunk_size=64 * 1024):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def content_hash(file):
+    """ Returns the SHA-256 of a Django File, e.g. an upload that is not saved yet """
+    sha = hashlib.sha256()
+    for chunk in file.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CompileCache(object):
+    """
+    Content addressed store of compiled binaries. An entry is keyed by the SHA-256 of the source, the
+    language, the compiler version and the compile command, so identical resubmissions and rejudges skip
+    compilation. The directory is bounded by `max_size` bytes, least recently used entries are evicted first.
+    Entries are written to a temporary file and renamed, which makes the cache safe to share between workers.
+    """
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def key(self, source_hash, language, command):
+        compiler = command[0]
+        parts = [source_hash, language, compiler_version(compiler), ' '.join(command)]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key, destination):
+        """ Copies the cached binary to `destination`, returns False on a cache miss """
+        path = self.path(key)
+        try:
+            os.utime(path, None)  # mark as recently used
+            shutil.copy2(path, destination)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def put(self, key, binary):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        os.close(fd)
+        try:
+            shutil.copy2(binary, tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            entries.sort()
+            while total > self.max_size and entries:
+                mtime, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+
+compile_cache = CompileCache(
+    getattr(settings, 'GRADER_COMPILE_CACHE_DIR', DEFAULT_CACHE_DIR),
+    getattr(settings, 'GRADER_COMPILE_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+)
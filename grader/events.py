@@ -0,0 +1,151 @@
+"""
+Server-sent event streams of grading events. Every web process runs one thread that reads new GradingEvent rows
+and wakes up the streams waiting for them, so the database is polled once per process however many browsers are
+watching.
+
+An open stream holds one thread of the web worker. A process serves at most MAX_STREAMS streams at a time so that
+the remaining threads stay free for page requests, further pages poll instead.
+"""
+import threading
+import time
+from collections import deque
+
+from django import db
+from django.conf import settings
+from django.db.models import Max
+
+from .models import GradingEvent
+
+
+POLL_INTERVAL = getattr(settings, 'GRADER_EVENT_POLL_INTERVAL', 1.0)  # seconds
+
+# Seconds a stream stays open. The browser reconnects afterwards and resumes from the last event it received.
+STREAM_DURATION = getattr(settings, 'GRADER_EVENT_STREAM_DURATION', 300)
+
+# Streams a web process serves at the same time, keep it well below the number of threads of the worker
+MAX_STREAMS = getattr(settings, 'GRADER_EVENT_MAX_STREAMS', 8)
+
+KEEPALIVE_INTERVAL = 15  # seconds
+RECONNECT_DELAY = 3000  # milliseconds
+BUFFER_SIZE = 1000  # events kept for streams that fall behind or reconnect
+
+
+class EventBroadcaster(object):
+    """ Reads new grading events while at least one stream is open and hands them to all streams """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, buffer_size=BUFFER_SIZE, max_listeners=MAX_STREAMS):
+        self.poll_interval = poll_interval
+        self.max_listeners = max_listeners
+        self.events = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.last_id = None
+        self.listeners = 0
+        self.thread = None
+
+    def subscribe(self):
+        """ Registers a stream and returns the id of the latest event, None if there are max_listeners streams """
+        with self.condition:
+            if self.listeners >= self.max_listeners:
+                return None
+            if self.thread is None:
+                # Nobody was listening, start from the current event
+                self.last_id = GradingEvent.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+                self.events.clear()
+                self.thread = threading.Thread(target=self.run, name='grading-events', daemon=True)
+                self.thread.start()
+            self.listeners += 1
+            return self.last_id
+
+    def unsubscribe(self):
+        with self.condition:
+            self.listeners -= 1
+
+    def poll(self):
+        # Rows are read in id order. On databases that allow concurrent writers an event can become visible after a
+        # later one, streams then miss it; the pages show the current state again when they are reloaded.
+        events = list(GradingEvent.objects.filter(pk__gt=self.last_id).order_by('pk')[:BUFFER_SIZE])
+        if events:
+            with self.condition:
+                self.events.extend(events)
+                self.last_id = events[-1].pk
+                self.condition.notify_all()
+
+    def run(self):
+        try:
+            while True:
+                with self.condition:
+                    if self.listeners <= 0:
+                        self.thread = None
+                        return
+                try:
+                    self.poll()
+                except db.Error:
+                    db.connection.close()
+                time.sleep(self.poll_interval)
+        finally:
+            db.connection.close()
+
+    def wait(self, after, timeout):
+        """ Returns the buffered events newer than `after`, waiting up to `timeout` seconds for one """
+        with self.condition:
+            if not self.events or self.events[-1].pk <= after:
+                self.condition.wait(timeout)
+            return [event for event in self.events if event.pk > after]
+
+
+broadcaster = EventBroadcaster()
+
+
+def format_event(kind, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append('id: {id}'.format(id=event_id))
+    lines.append('event: {kind}'.format(kind=kind))
+    lines.append('data: {data}'.format(data=data))
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventStream(object):
+    """ Iterable of the response that unregisters the stream when the response is closed """
+
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            broadcaster.unsubscribe()
+
+
+def stream(accept, last_event_id=None, initial=None):
+    """
+    Returns an EventStream of the events for which accept(event) is true in the text/event-stream format,
+    starting after `last_event_id` (the browser's Last-Event-ID) or at the current event. `initial` is sent
+    first. Returns None when the process already serves MAX_STREAMS streams.
+    """
+    latest = broadcaster.subscribe()
+    if latest is None:
+        return None
+    after = latest if last_event_id is None else last_event_id
+    return EventStream(_events(accept, after, initial))
+
+
+def _events(accept, after, initial):
+    yield 'retry: {delay}\n\n'.format(delay=RECONNECT_DELAY)
+    if initial is not None:
+        yield initial
+    deadline = time.time() + STREAM_DURATION
+    while time.time() < deadline:
+        events = broadcaster.wait(after, KEEPALIVE_INTERVAL)
+        if not events:
+            yield ': keepalive\n\n'
+            continue
+        for event in events:
+            after = event.pk
+            if accept(event):
+                yield format_event(event.kind, event.data, event.pk)
@@ -0,0 +1,68 @@
+"""
+Exports of the contest results for the organisers. Rows are read with QuerySet.iterator() and written one by one,
+so memory use does not grow with the size of the contest.
+"""
+import csv
+import json
+
+from accounts.models import LeaderboardEntry
+
+from .models import BestScore, Solution
+
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def leaderboard_rows():
+    return LeaderboardEntry.objects.order_by('rank').values_list('rank', 'user__username', 'score', 'total_time')
+
+
+def best_score_rows():
+    return BestScore.objects.order_by('user_id', 'question_id').values_list(
+        'user__username', 'question__code', 'best_score', 'best_timestamp', 'attempts'
+    )
+
+
+def submission_rows():
+    return Solution.objects.order_by('pk').values_list(
+        'pk', 'user__username', 'question__code', 'language', 'status', 'result', 'score', 'timestamp',
+        'max_cpu_time', 'max_wall_time', 'max_memory'
+    )
+
+
+# name -> (column names, function returning the rows)
+EXPORTS = {
+    'leaderboard': (['rank', 'username', 'score', 'total_time'], leaderboard_rows),
+    'best_scores': (['username', 'question', 'best_score', 'best_timestamp', 'attempts'], best_score_rows),
+    'submissions': (
+        ['id', 'username', 'question', 'language', 'status', 'result', 'score', 'timestamp', 'max_cpu_time',
+         'max_wall_time', 'max_memory'],
+        submission_rows
+    ),
+}
+
+
+class Echo(object):
+    """ File-like object that returns what is written to it, lets csv.writer produce one line at a time """
+
+    def write(self, value):
+        return value
+
+
+def to_json(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export(name, export_format):
+    """ Yields the lines of the export `name` in `export_format` ('csv' or 'ndjson') """
+    columns, rows = EXPORTS[name]
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows().iterator():
+            yield writer.writerow(row)
+    else:
+        for row in rows().iterator():
+            yield json.dumps({column: to_json(value) for column, value in zip(columns, row)}) + '\n'
@@ -0,0 +1,163 @@
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+
+from . import runner
+
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pyserver.py')
+
+# Number of warm interpreters per Python version in every grading process
+POOL_SIZE = getattr(settings, 'GRADER_PYTHON_FORKSERVER_POOL', 4)
+
+
+class ServerDied(Exception):
+    """ The warm interpreter exited while it ran a request. `pid` is its child, None if it was not forked yet. """
+
+    def __init__(self, pid=None):
+        super(ServerDied, self).__init__('Python fork server exited')
+        self.pid = pid
+
+
+class WarmInterpreter(object):
+    """ One running pyserver.py process, used by one thread at a time """
+
+    def __init__(self, executable):
+        self.process = subprocess.Popen(
+            [executable, SERVER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd='/', universal_newlines=True
+        )
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def read_line(self, pid=None):
+        line = self.process.stdout.readline()
+        if not line:
+            raise ServerDied(pid)
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise ServerDied(pid)
+
+    def request(self, request):
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+        except OSError:
+            raise ServerDied()
+        pid = self.read_line()['pid']
+        return self.read_line(pid)
+
+    def close(self):
+        if self.alive:
+            self.process.kill()
+            self.process.wait()
+
+
+class InterpreterPool(object):
+    """
+    Hands out up to `size` warm interpreters of one Python executable. Interpreters are started on demand,
+    one that has died frees its place, so a new one is started for the next request.
+    """
+
+    def __init__(self, executable, size):
+        self.executable = executable
+        self.size = size
+        self.idle = []
+        self.started = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                while self.idle:
+                    interpreter = self.idle.pop()
+                    if interpreter.alive:
+                        return interpreter
+                    interpreter.close()
+                    self.started -= 1
+                if self.started < self.size:
+                    self.started += 1
+                    break
+                self.condition.wait()
+        try:
+            return WarmInterpreter(self.executable)
+        except OSError:
+            with self.condition:
+                self.started -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, interpreter):
+        with self.condition:
+            if interpreter.alive:
+                self.idle.append(interpreter)
+            else:
+                interpreter.close()
+                self.started -= 1
+            self.condition.notify()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(executable):
+    with _pools_lock:
+        if executable not in _pools:
+            _pools[executable] = InterpreterPool(executable, POOL_SIZE)
+        return _pools[executable]
+
+
+def run(executable, script, stdin, stdout, cwd, time_limit, memory_limit):
+    """
+    Runs a Python script like runner.run(), but in a child forked from a warm interpreter instead of a new
+    process. `stdin` and `stdout` are paths. The time spent forking and preparing the child is returned as
+    RunResult.startup and is not counted against the time limit.
+    """
+    pool = get_pool(executable)
+    interpreter = pool.acquire()
+    started = time.time()
+    try:
+        response = interpreter.request({
+            'script': script,
+            'stdin': stdin,
+            'stdout': stdout,
+            'cwd': cwd,
+            'time_limit': time_limit,
+            'address_space': runner.address_space_limit(memory_limit),
+            'memory_limit': memory_limit * 1024,  # KB of resident memory
+            'output_limit': runner.OUTPUT_LIMIT,
+            'process_limit': runner.PROCESS_LIMIT,
+        })
+    except ServerDied as e:
+        # The submission may have killed the server, it is judged a runtime error
+        interpreter.close()
+        if e.pid is not None:
+            try:
+                os.killpg(e.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        return runner.RunResult('re', None, 0.0, time.time() - started, 0, None)
+    finally:
+        pool.release(interpreter)
+
+    if response['exit_code'] is not None:
+        returncode = response['exit_code']
+    else:
+        returncode = -response['signal']
+    status = runner.classify(
+        response['timed_out'], response['cpu_time'], response['signal'] == signal.SIGXCPU,
+        response['memory'], returncode, time_limit, memory_limit, response['out_of_memory']
+    )
+    return runner.RunResult(
+        status, returncode, response['cpu_time'], response['wall_time'], response['memory'], response['startup']
+    )
@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+import uuid
+
+from django import db
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import LeaderboardEntry, User
+from grader.models import Solution
+from questions.models import Question
+
+
+def _write(user_id, question_id, seconds, results):
+    """ Saves a graded submission and adds to the user's score, like the grader does, until the time is up """
+    user = User.objects.get(pk=user_id)
+    writes = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        with transaction.atomic():
+            Solution.objects.create(
+                user=user, question_id=question_id, file='benchmark/solution.py', language='py3',
+                status='graded', result='ac', score=1
+            )
+            User.objects.add_score(user, 1, 1)
+        writes += 1
+    results.put(writes)
+
+
+class Command(BaseCommand):
+    help = ('Measures how many graded submissions per second the configured database can store from concurrent '
+            'processes. Run it against a scratch copy of the database, e.g. once with the SQLite file and once '
+            'with DATABASE_URL pointing to Postgres. The rows it creates are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Number of concurrent writers (default: 4)')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of the benchmark (default: 10)')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        name = 'bench-' + uuid.uuid4().hex[:8]
+        question = Question.objects.create(code=name[-10:], title=name, description='benchmark/description.png')
+        # bulk_create does not send post_save, so no activation emails are sent to the benchmark users
+        User.objects.bulk_create([
+            User(username='{name}-{i}'.format(name=name, i=i), email='{name}-{i}@example.com'.format(name=name, i=i))
+            for i in range(processes)
+        ])
+        users = list(User.objects.filter(username__startswith=name + '-').values_list('pk', flat=True))
+
+        results = multiprocessing.Queue()
+        # Database connections must not be shared between the parent and the forked writers
+        db.connections.close_all()
+        writers = [
+            multiprocessing.Process(target=_write, args=(user_id, question.pk, options['seconds'], results))
+            for user_id in users
+        ]
+        started = time.time()
+        for writer in writers:
+            writer.start()
+        writes = sum(results.get() for _ in writers)
+        elapsed = time.time() - started
+        for writer in writers:
+            writer.join()
+
+        Solution.objects.filter(question=question).delete()
+        User.objects.filter(pk__in=users).delete()
+        question.delete()
+        LeaderboardEntry.objects.rebuild()  # close the gaps left by the deleted users
+
+        self.stdout.write('{vendor}: {writes} graded submissions in {elapsed:.1f}s with {processes} process(es), '
+                          '{rate:.1f} per second'.format(vendor=connection.vendor, writes=writes, elapsed=elapsed,
+                                                         processes=processes, rate=writes / elapsed))
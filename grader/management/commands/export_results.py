@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from grader.export import EXPORTS, EXPORT_FORMATS, export
+
+
+class Command(BaseCommand):
+    help = 'Writes the leaderboard, the best scores or all submissions as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Output format (default: csv)')
+        parser.add_argument('--output', help='File to write to (default: standard output)')
+
+    def handle(self, *args, **options):
+        lines = export(options['name'], options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,35 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from grader.worker import REQUEUE_AFTER, WorkerPool
+
+
+class Command(BaseCommand):
+    help = 'Grades queued submissions. Run this next to the web process, e.g. as a Heroku worker dyno.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of submissions graded in parallel (default: number of CPUs)')
+        parser.add_argument('--test-concurrency', type=int,
+                            help='Number of test cases of one submission run at the same time '
+                                 '(default: number of CPUs divided by the number of workers)')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when there is nothing to grade')
+        parser.add_argument('--requeue-after', type=int, default=REQUEUE_AFTER,
+                            help='Seconds after which a running submission is considered abandoned')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        concurrency = options['test_concurrency'] or max(1, multiprocessing.cpu_count() // workers)
+        pool = WorkerPool(
+            workers,
+            self.stdout,
+            self.stderr,
+            once=options['once'],
+            poll_interval=options['poll_interval'],
+            concurrency=concurrency,
+            requeue_after=options['requeue_after']
+        )
+        pool.run()
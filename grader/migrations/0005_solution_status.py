@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def mark_graded_solutions(apps, schema_editor):
+    Solution = apps.get_model('grader', 'Solution')
+    Solution.objects.filter(result__isnull=False).update(status='graded')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grader', '0004_auto_20180425_1349'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='started',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('graded', 'Graded'), ('error', 'Error')], default='queued', max_length=10),
+        ),
+        migrations.RunPython(mark_graded_solutions, migrations.RunPython.noop),
+    ]
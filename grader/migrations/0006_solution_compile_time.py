@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grader', '0005_solution_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='compile_cached',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='compile_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grader', '0007_solution_detail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='cpu_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grader', '0008_solution_cpu_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='max_cpu_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='max_memory',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='max_wall_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='solution',
+            name='result',
+            field=models.CharField(blank=True, choices=[('ac', 'AC'), ('wa', 'WA'), ('tle', 'TLE'), ('mle', 'MLE'), ('cte', 'CTE'), ('sigabrt', 'SIGABRT'), ('pc', 'Partially Correct')], max_length=10, null=True),
+        ),
+    ]
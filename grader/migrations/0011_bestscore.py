@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:35
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_best_scores(apps, schema_editor):
+    Solution = apps.get_model('grader', 'Solution')
+    BestScore = apps.get_model('grader', 'BestScore')
+    # Like Solution.award_score(), only accepted and partially correct submissions are recorded
+    graded = Solution.objects.filter(result__in=['ac', 'pc']).order_by('user', 'question', '-score', 'timestamp')
+    best_scores = {}
+    for user_id, question_id, score, timestamp in graded.values_list('user', 'question', 'score', 'timestamp').iterator():
+        best = best_scores.get((user_id, question_id))
+        if best is None:
+            # The first submission of a pair is its best one
+            best_scores[(user_id, question_id)] = BestScore(
+                user_id=user_id, question_id=question_id, best_score=score, best_timestamp=timestamp, attempts=1
+            )
+        else:
+            best.attempts += 1
+    BestScore.objects.bulk_create(best_scores.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questions', '0009_question_memory_limit'),
+        ('grader', '0010_solution_max_startup_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_score', models.IntegerField(default=0)),
+                ('best_timestamp', models.DateTimeField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questions.Question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='bestscore',
+            unique_together=set([('user', 'question')]),
+        ),
+        migrations.RunPython(fill_best_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grader', '0011_bestscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['user', 'question', '-score', 'timestamp'], name='grader_solu_user_id_04ad6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['status', 'timestamp'], name='grader_solu_status_e28b88_idx'),
+        ),
+    ]
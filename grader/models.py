@@ -1,13 +1,33 @@
+import json
+import multiprocessing
 import os
+import resource
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import pre_save
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from questions.models import Question, TestCase, ExpectedOutput
+from accounts.models import LeaderboardEntry
+from accounts.signals import rank_changed
+from questions.models import Question
+from grader.util import start_time
+from grader.compile_cache import compile_cache, content_hash, file_hash
+from grader.test_data import test_data_cache
+from grader.plan import get_test_plan
+from grader.checkers import compare
+from grader.signals import solution_graded
+from judge.cache import invalidate, user_namespace
+from grader import forkserver, runner
 
 
 User = get_user_model()
@@ -16,24 +36,79 @@ RESULT_TYPES = (
     ('ac', 'AC'),           # Correct Answer
     ('wa', 'WA'),           # Wrong Answer
     ('tle', 'TLE'),         # Time Limit Exceeded
+    ('mle', 'MLE'),         # Memory Limit Exceeded
     ('cte', 'CTE'),         # Compile Time Error
     ('sigabrt', 'SIGABRT'),  # Runtime Error
     ('pc', 'Partially Correct')  # Partially Correct
 )
 
-SUBMISSION_EVALUATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'submission_evaluation')
+STATUS_TYPES = (
+    ('queued', 'Queued'),    # Waiting for a grading worker
+    ('running', 'Running'),  # Claimed by a grading worker
+    ('graded', 'Graded'),    # Result is available
+    ('error', 'Error'),      # Grader failed, needs a rejudge
+)
+
+EVENT_TYPES = (
+    ('status', 'Status'),  # A submission moved to another status
+    ('rank', 'Rank'),      # A user moved on the leaderboard
+)
+
+COMPILE_COMMANDS = {
+    'c': ['gcc', '-o', '{name}', '{name}.c'],
+    'cpp': ['g++', '-o', '{name}', '{name}.cpp'],
+    # 'java': ['javac', '{name}.java'],
+}
+
+EXECUTE_COMMANDS = {
+    'c': ['./{name}'],
+    'cpp': ['./{name}'],
+    # 'java': ['java', '{name}'],
+    'py2': ['python2', '{name}.py'],
+    'py3': ['python3', '{name}.py'],
+}
+
+PYTHON_EXECUTABLES = {
+    'py2': 'python2',
+    'py3': 'python3',
+}
+
+# Run Python submissions in children forked from warm interpreters instead of starting python for every run
+USE_FORKSERVER = getattr(settings, 'GRADER_PYTHON_FORKSERVER', False)
+
+# Verdicts of the runs that did not finish normally
+RUN_VERDICTS = {
+    'tle': 'tle',
+    'mle': 'mle',
+    're': 'sigabrt',
+}
+
+# Number of test cases of one submission that are run at the same time
+TEST_CONCURRENCY = getattr(settings, 'GRADER_TEST_CONCURRENCY', multiprocessing.cpu_count())
+
+# Parent directory of the per-submission sandboxes, defaults to the system's temporary directory
+SANDBOX_ROOT = getattr(settings, 'GRADER_SANDBOX_ROOT', None)
 
 
 def upload_solution_file_location(instance, filename):
-    location = 'submissions/{username}/'.format(username=instance.user.username)
+    """
+    Submissions are stored under the SHA-256 of their content, so identical uploads share one file. The hash
+    is set when the Solution is saved, files saved with `solution.file.save()` keep a per-user name.
+    """
     file, ext = os.path.splitext(filename)
-    return location + instance.question.code + ext
+    if not instance.source_hash:
+        return 'submissions/{username}/{code}{ext}'.format(
+            username=instance.user.username, code=instance.question.code, ext=ext
+        )
+    return 'submissions/{prefix}/{hash}{ext}'.format(
+        prefix=instance.source_hash[:2], hash=instance.source_hash, ext=ext
+    )
 
 
 class SolutionQuerySet(models.query.QuerySet):
 
     def get_by_question(self, question_code):
-        return self.filter(question__code=question_code)
+        return self.filter(question_id=Question.objects.get_id_by_code(question_code))
 
     def get_by_user(self, username):
         return self.filter(user__username=username)
@@ -41,6 +116,13 @@ class SolutionQuerySet(models.query.QuerySet):
     def get_by_user_question(self, username, question_code):
         return self.get_by_user(username).get_by_question(question_code)
 
+    def queued(self):
+        return self.filter(status='queued', result__isnull=True)
+
+    def rejudge(self):
+        """ Puts the submissions the grader failed on back in the queue, returns their number """
+        return self.filter(status='error').update(status='queued', result=None, started=None, detail='')
+
 
 class SolutionManager(models.Manager):
 
@@ -56,20 +138,59 @@ class SolutionManager(models.Manager):
     def get_by_user_question(self, username, question_code):
         return self.get_queryset().get_by_user_question(username, question_code)
 
+    def queued(self):
+        return self.get_queryset().queued()
+
+    def claim_next(self):
+        """
+        Marks the oldest queued submission as running and returns it. The conditional update makes sure
+        that a submission is claimed by only one worker even when several workers poll the same table.
+        """
+        candidates = self.queued().order_by('timestamp').values_list('pk', flat=True)[:10]
+        for pk in candidates:
+            claimed = self.get_queryset().filter(pk=pk, status='queued').update(
+                status='running', started=timezone.now()
+            )
+            if claimed:
+                submission = self.get_queryset().select_related('question', 'user').get(pk=pk)
+                GradingEvent.objects.status_changed(submission)
+                return submission
+        return None
+
+    def requeue_stale(self, seconds):
+        """ Puts back the submissions whose worker died while grading them """
+        limit = timezone.now() - timedelta(seconds=seconds)
+        return self.get_queryset().filter(status='running', started__lt=limit).update(status='queued')
+
 
 class Solution(models.Model):
     question = models.ForeignKey(Question)
     user = models.ForeignKey(User)
     file = models.FileField(upload_to=upload_solution_file_location)
+    source_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the file, empty for old submissions
     language = models.CharField(max_length=10)
     result = models.CharField(max_length=10, choices=RESULT_TYPES, null=True, blank=True)
     score = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_TYPES, default='queued')
+    started = models.DateTimeField(null=True, blank=True)  # when a worker claimed the submission
+    compile_time = models.FloatField(null=True, blank=True)  # seconds, including cache lookups
+    compile_cached = models.BooleanField(default=False)  # binary was taken from the compile cache
+    detail = models.CharField(max_length=255, blank=True)  # first wrong answer, for the organisers
+    cpu_time = models.FloatField(null=True, blank=True)  # seconds of CPU the grader spent on the submission
+    max_cpu_time = models.FloatField(null=True, blank=True)  # seconds, slowest test case
+    max_wall_time = models.FloatField(null=True, blank=True)  # seconds, slowest test case
+    max_memory = models.IntegerField(null=True, blank=True)  # KB, peak resident memory of any test case
+    max_startup_time = models.FloatField(null=True, blank=True)  # seconds, not counted by the Python fork server
     timestamp = models.DateTimeField(auto_now_add=True)
 
     objects = SolutionManager()
 
     class Meta:
         ordering = ['-score', 'timestamp']
+        indexes = [
+            models.Index(fields=['user', 'question', '-score', 'timestamp']),  # a user's submissions for a question
+            models.Index(fields=['status', 'timestamp']),  # the grading queue
+        ]
 
     def __str__(self):
         return self.user.username + ' - ' + self.question.code
@@ -83,157 +204,325 @@ class Solution(models.Model):
     def get_absolute_url(self):
         return self.file.url
 
-    def clear_evaluation_path_contents(self):
-        # When files are stored in local server
-        #
-        # name = self.filename
-        # if self.language == 'java':
-        #     name += '.class'
-        # if os.path.exists(name):
-        #     os.remove(name)
-
-        # When files are stored in non-local server
-        os.chdir(SUBMISSION_EVALUATION_PATH)
-        for file in os.listdir(os.getcwd()):
-            if file != 'version_control.txt':
-                os.remove(file)
-
-    def compile(self):
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def status_data(self):
+        """ What the browser is told about the submission's status """
+        return {
+            'solution': self.pk,
+            'status': self.status,
+            'result': self.result,
+            'score': self.score,
+        }
+
+    def compile(self, workdir):
+        """ Compiles the submission, reusing the binary of an identical earlier submission if possible """
         name = self.filename
-        if self.language == 'c':
-            cmd = 'gcc -o {name} {name}.c'.format(name=name)
-        elif self.language == 'cpp':
-            cmd = 'g++ -o {name} {name}.cpp'.format(name=name)
-        # elif self.language == 'java':
-        #     cmd = 'javac {name}.java'.format(name=name)
-        elif 'py' in self.language:
+        if 'py' in self.language:
             return 'success'
-        else:
+        template = COMPILE_COMMANDS.get(self.language)
+        if template is None:
             return 'cte'  # Compile Time Error
+        command = [arg.format(name=name) for arg in template]
 
-        try:
-            process = subprocess.check_output(cmd, shell=True)
-        except subprocess.CalledProcessError:
-            return 'cte'  # Compile Time Error
+        started = time.time()
+        source_hash = self.source_hash or file_hash(
+            os.path.join(workdir, '{name}.{ext}'.format(name=name, ext=self.language))
+        )
+        key = compile_cache.key(source_hash, self.language, template)
+        self.compile_cached = compile_cache.get(key, os.path.join(workdir, name))
+        if not self.compile_cached:
+            try:
+                process = subprocess.check_output(command, cwd=workdir, stderr=subprocess.STDOUT)
+            except subprocess.CalledProcessError:
+                self.compile_time = time.time() - started
+                return 'cte'  # Compile Time Error
+            compile_cache.put(key, os.path.join(workdir, name))
+        self.compile_time = time.time() - started
         return 'success'
 
-    def execute(self, input_test_case):
+    def execute(self, workdir, input_test_case, output, time_limit, memory_limit):
+        """
+        Runs the submission with `input_test_case` as stdin and writes its stdout to `output` (both paths).
+        Returns the RunResult of the run, None if the language cannot be executed.
+        """
         name = self.filename
-        if self.language in ['c', 'cpp']:
-            cmd = './{name} < {input_file} > {name}.txt'.format(name=name, input_file=input_test_case)
-        # elif self.language == 'java':
-        #     cmd = 'java {name} < {input_file} > {name}.txt'.format(name=name, input_file=input_test_case)
-        elif self.language == 'py2':
-            cmd = 'python2 {name}.py < {input_file} > {name}.txt'.format(name=name, input_file=input_test_case)
-        elif self.language == 'py3':
-            cmd = 'python3 {name}.py < {input_file} > {name}.txt'.format(name=name, input_file=input_test_case)
-        else:
+        template = EXECUTE_COMMANDS.get(self.language)
+        if template is None:
             return None
+        command = [arg.format(name=name) for arg in template]
 
-        try:
-            process = subprocess.check_output(cmd, shell=True, timeout=self.question.time_limit)
-        except subprocess.CalledProcessError:
-            return 'sigabrt'  # Runtime Error
-        except subprocess.TimeoutExpired:
-            return 'tle'  # Time Limit Exceeded
-        except Exception as e:
-            print("\nabcdhfvbusrb")
-            print(e)
-        return 'success'
-
-    def verify(self, expected_output):
-        output = self.filename + '.txt'
-        with open(output) as answer, open(expected_output) as solution:
-            answer_lines = answer.readlines()
-            solution_lines = solution.readlines()
-            for i, j in zip(answer_lines, solution_lines):
-                if i.strip() != j.strip():
-                    return False
-            return True
-
-    def evaluate(self):
-        # fetch_file_cmd = os.chdir(os.path.join(settings.MEDIA_ROOT, os.path.dirname(self.file.name)))
-        # os.chdir(os.path.join(settings.MEDIA_ROOT, os.path.dirname(self.file.name)))
-        # print(self.file.name)
-        # print(os.getcwd())
-        # download the file from AWS
-        os.chdir(SUBMISSION_EVALUATION_PATH)
-        get_submission = 'cp {root}/{filename} .'.format(
-            root=settings.MEDIA_ROOT,
-            filename=self.file.name
+        if USE_FORKSERVER and self.language in PYTHON_EXECUTABLES:
+            return forkserver.run(
+                PYTHON_EXECUTABLES[self.language], os.path.join(workdir, name + '.py'), input_test_case, output,
+                workdir, time_limit, memory_limit
+            )
+        with open(input_test_case, 'rb') as stdin, open(output, 'wb') as stdout:
+            return runner.run(command, stdin, stdout, workdir, time_limit, memory_limit)
+
+    def verify(self, output, expected_output, checker='whitespace', tolerance=1e-6):
+        """ Returns None if the output matches `expected_output`, else the first Mismatch """
+        return compare(output, expected_output, checker=checker, tolerance=tolerance)
+
+    def evaluate(self, concurrency=None, commit=True):
+        """
+        Every evaluation runs in its own sandbox directory, so several submissions can be graded at the same
+        time by different threads or processes without overwriting each other's binaries and outputs.
+        Up to `concurrency` test cases of the submission are run at the same time. The result is saved unless
+        `commit` is false.
+        """
+        usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        with tempfile.TemporaryDirectory(prefix='grade-{pk}-'.format(pk=self.pk), dir=SANDBOX_ROOT) as workdir:
+            forked_cpu_time = self._evaluate(workdir, concurrency or TEST_CONCURRENCY)
+        usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # Runs forked by the Python fork server are children of the server, not of the grader
+        self.cpu_time = forked_cpu_time + (
+            (usage_after.ru_utime + usage_after.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime)
         )
-        process = subprocess.check_output(get_submission, shell=True)
+        if commit:
+            self.save()
+        return self.result
+
+    def _evaluate(self, workdir, concurrency):
+        """ Grades the submission in `workdir`, returns the CPU time of the runs made by the Python fork server """
+        # download the file from the storage backend (AWS in production)
+        source = os.path.join(workdir, os.path.basename(self.file.name))
+        with open(source, 'wb') as local_file, self.file.storage.open(self.file.name, 'rb') as remote_file:
+            shutil.copyfileobj(remote_file, local_file)
 
         # compile submission
-        if self.compile() != 'success':
-            return 'cte'
-        
-        # Fetch test case model
-        tc_input_dir_contents = TestCase.objects.get_by_question(self.question.code)
-        name = self.filename
+        if self.compile(workdir) != 'success':
+            self.result = 'cte'
+            self.score = 0
+            return 0.0
+
+        # Fetch the test cases, their expected outputs and the limits of the question
+        plan = get_test_plan(self.question_id)
 
         # Execute submissions against input test cases
-        ac_count = 0
-        tle_count = 0
-        sigabrt_count = 0
-        wa_count = 0
-        for t_in in tc_input_dir_contents:
-            get_test_case = 'cp {root}/{filename} .'.format(
-                root=settings.MEDIA_ROOT,
-                filename=t_in.file.name
+        if plan.policy == 'sample_first':
+            samples = [test for test in plan.tests if test.is_sample]
+            results = self.run_tests(workdir, samples, plan, concurrency, stop_on_failure=True)
+            if all(verdict == 'ac' for verdict, detail, run in results):
+                others = plan.tests[len(samples):]
+                results += self.run_tests(workdir, others, plan, concurrency, offset=len(samples))
+        else:
+            results = self.run_tests(workdir, plan.tests, plan, concurrency,
+                                     stop_on_failure=plan.policy == 'fail_fast')
+
+        verdicts = [verdict for verdict, detail, run in results]
+        runs = [run for verdict, detail, run in results if run is not None]
+        self.detail = next((detail for verdict, detail, run in results if detail), '')
+        self.max_cpu_time = max([run.cpu_time for run in runs] or [None])
+        self.max_wall_time = max([run.wall_time for run in runs] or [None])
+        self.max_memory = max([run.memory for run in runs] or [None])
+        self.max_startup_time = max([run.startup for run in runs if run.startup is not None] or [None])
+        self.result = self.overall_result(verdicts, len(plan.tests))
+        if len(verdicts) < len(plan.tests):
+            # The policy stopped at a failed test case, the tests that were not run would decide the score
+            self.score = 0
+        else:
+            self.score = sum(test.weight for test, verdict in zip(plan.tests, verdicts) if verdict == 'ac')
+        self.timestamp = timezone.now()
+        return sum(run.cpu_time for run in runs if run.startup is not None)
+
+    def run_tests(self, workdir, tests, plan, concurrency, stop_on_failure=False, offset=0):
+        """
+        Runs `tests` on up to `concurrency` threads and returns their (verdict, detail, run) in the order of
+        `tests`. With `stop_on_failure`, the list ends at the first test that is not accepted and the tests
+        after it that have not started yet are skipped.
+        """
+        first_failure = [len(tests)]
+        lock = threading.Lock()
+
+        def run(index, test):
+            # Tests after a failed one are skipped, even when a thread picks them up before they are cancelled
+            if stop_on_failure and index > first_failure[0]:
+                return None
+            result = self.run_test(workdir, offset + index, test, plan)
+            if stop_on_failure and result[0] != 'ac':
+                with lock:
+                    first_failure[0] = min(first_failure[0], index)
+            return result
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(run, index, test): index for index, test in enumerate(tests)}
+            results = [None] * len(tests)
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                index = futures[future]
+                results[index] = future.result()
+                if stop_on_failure and results[index] is not None and results[index][0] != 'ac':
+                    for pending, pending_index in futures.items():
+                        if pending_index > index:
+                            pending.cancel()
+        if stop_on_failure:
+            return results[:first_failure[0] + 1]
+        return results
+
+    def run_test(self, workdir, index, test, plan):
+        """
+        Runs the submission against one PlannedTest. Returns its verdict, the reason of a WA and the RunResult.
+        """
+        # run submission against the input test case, read from the grader's local copy
+        output = os.path.join(workdir, 'output-{index}.txt'.format(index=index))
+        run = self.execute(
+            workdir, test_data_cache.fetch(test.test_case), output, plan.time_limit, plan.memory_limit
+        )
+        if run is None:
+            return 'sigabrt', '', None
+        if run.status != 'ok':
+            return RUN_VERDICTS[run.status], '', run
+
+        # verify the output with the expected output
+        if test.expected_output is None:
+            return 'wa', '', run
+        mismatch = self.verify(
+            output, test_data_cache.fetch(test.expected_output), plan.checker, plan.float_tolerance
+        )
+        if mismatch is not None:
+            detail = '{test}: {message} at line {line}, column {column}'.format(
+                test=test.test_case.filename, message=mismatch.message, line=mismatch.line, column=mismatch.column
             )
-            process = subprocess.check_output(get_test_case, shell=True)
-
-            # run submission against the input test case
-            print(t_in.filename)
-            msg = self.execute(t_in.filename)
-            
-            if msg != 'success':
-                if msg == 'tle':
-                    tle_count += 1
-                elif msg == 'sigabrt':
-                    sigabrt_count += 1
-                continue
-                # self.clear_evaluation_path_contents()
-                # self.save()
-                # return msg
-
-            t_out = ExpectedOutput.objects.get_by_question_test_case(self.question.code, t_in).first()
-
-            # download the expected output from AWS
-            get_test_case = 'cp {root}/{filename} .'.format(
-                root=settings.MEDIA_ROOT,
-                filename=t_out.file.name
+            return 'wa', detail, run
+        return 'ac', '', run
+
+    @staticmethod
+    def overall_result(verdicts, total):
+        """
+        Combines the verdicts of the test cases that were run. `verdicts` is shorter than `total` when the
+        judging policy stopped early, the result is then the verdict of the test case that failed.
+        """
+        ac_count = verdicts.count('ac')
+        if total and ac_count == total:
+            return 'ac'
+        if len(verdicts) < total:
+            return verdicts[-1]
+        if total and verdicts.count('tle') == total:
+            return 'tle'
+        if total and verdicts.count('mle') == total:
+            return 'mle'
+        if total and verdicts.count('sigabrt') == total:
+            return 'sigabrt'
+        if verdicts.count('wa') == total or ac_count == 0:
+            return 'wa'
+        return 'pc'
+
+    def award_score(self):
+        """
+        Records an accepted or partially correct submission in the user's BestScore for the question and adds the
+        improvement over the previous best to the user's score and time. Returns the score that was added.
+        """
+        if self.result != 'ac' and self.result != 'pc':
+            return 0
+        with transaction.atomic():
+            best, created = BestScore.objects.select_for_update().get_or_create(
+                user=self.user, question=self.question,
+                defaults={'best_score': self.score, 'best_timestamp': self.timestamp, 'attempts': 1}
             )
-            process = subprocess.check_output(get_test_case, shell=True)
-
-            # verify the output with the expected output
-            if not self.verify(t_out.filename):
-                # self.clear_evaluation_path_contents()
-                self.save()
-                wa_count += 1
-                continue
-            ac_count += 1
-        
-        # Set overall result status
-        self.score = ac_count * 10
-        self.timestamp = timezone.now()
-        if ac_count == 10:
-            self.result = 'ac'
-        elif tle_count == 10:
-            self.result = 'tle'
-        elif sigabrt_count == 10:
-            self.result = 'sigabrt'
-        elif wa_count == 10 or ac_count == 0:
-            self.result = 'wa'
-        else:
-            self.result = 'pc'
+            if created:
+                time_diff = (datetime.now() - start_time).total_seconds()
+                User.objects.add_score(self.user, self.score, time_diff)
+                return self.score
+
+            previous_score, previous_timestamp = best.best_score, best.best_timestamp
+            best.record(self)
+            score_diff = self.score - previous_score
+            if score_diff > 0:
+                time_diff_up = (self.timestamp - previous_timestamp).total_seconds()
+                User.objects.add_score(self.user, score_diff, time_diff_up)
+                return score_diff
+            return 0
+
+    def grade(self, concurrency=None):
+        """
+        Evaluates the submission and updates the user's score. Called by the grading worker. The result and the
+        score are saved in one transaction, a worker that dies before it commits leaves the submission running
+        and requeue_stale() puts it back in the queue.
+        """
+        self.evaluate(concurrency, commit=False)
+        with transaction.atomic():
+            self.status = 'graded'
+            self.save()
+            score = self.award_score()
+        solution_graded.send(sender=Solution, instance=self, score_changed=score != 0)
+
+
+class BestScore(models.Model):
+    """ Best graded submission of a user for a question, maintained by Solution.award_score() """
+    user = models.ForeignKey(User)
+    question = models.ForeignKey(Question)
+    best_score = models.IntegerField(default=0)
+    best_timestamp = models.DateTimeField()  # submission time of the first submission with the best score
+    attempts = models.PositiveIntegerField(default=0)  # accepted or partially correct submissions
 
-        # self.clear_evaluation_path_contents()
+    class Meta:
+        unique_together = ['user', 'question']
+
+    def __str__(self):
+        return self.user.username + ' - ' + self.question.code
+
+    def record(self, submission):
+        """ Counts a scoring submission and keeps it if it beats the best one """
+        self.attempts += 1
+        if submission.score > self.best_score or (
+                submission.score == self.best_score and submission.timestamp < self.best_timestamp):
+            self.best_score = submission.score
+            self.best_timestamp = submission.timestamp
         self.save()
 
 
+class GradingEventManager(models.Manager):
+
+    def status_changed(self, solution):
+        return self.create(
+            kind='status', user_id=solution.user_id, solution_id=solution.pk, data=json.dumps(solution.status_data)
+        )
+
+    def rank_changed(self, entry, old_rank):
+        return self.create(kind='rank', user_id=entry.user_id, data=json.dumps({
+            'username': entry.user.username,
+            'old_rank': old_rank,
+            'rank': entry.rank,
+            'score': entry.score,
+            'total_time': entry.total_time,
+        }))
+
+    def prune(self, seconds):
+        """ Deletes the events older than `seconds`, streams only need the recent ones """
+        limit = timezone.now() - timedelta(seconds=seconds)
+        return self.get_queryset().filter(timestamp__lt=limit).delete()
+
+
+class GradingEvent(models.Model):
+    """ Change of a submission's status or of a user's rank, streamed to the browsers by grader.events """
+    kind = models.CharField(max_length=10, choices=EVENT_TYPES)
+    user = models.ForeignKey(User)
+    solution = models.ForeignKey(Solution, null=True, blank=True)
+    data = models.TextField()  # JSON sent to the browser
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = GradingEventManager()
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return '{kind} {data}'.format(kind=self.kind, data=self.data)
+
+
 def solution_pre_save_receiver(sender, instance, *args, **kwargs):
+    if instance.file and not instance.file._committed:
+        # A new upload, reuse the stored copy of an identical earlier upload instead of saving it again
+        instance.source_hash = content_hash(instance.file)
+        name = instance.file.field.generate_filename(instance, instance.file.name)
+        if instance.file.storage.exists(name):
+            instance.file.name = name
+            instance.file._committed = True
     if instance.language is None:
         name, ext = os.path.splitext(instance.file.name)
         lang = ext[1:]
@@ -246,3 +535,23 @@ def solution_pre_save_receiver(sender, instance, *args, **kwargs):
         instance.language = lang
 
 pre_save.connect(solution_pre_save_receiver, sender=Solution)
+
+
+def solution_graded_receiver(sender, instance, score_changed, *args, **kwargs):
+    invalidate(user_namespace(instance.user.username))
+    if score_changed:
+        invalidate('leaderboard')
+
+solution_graded.connect(solution_graded_receiver, sender=Solution)
+
+
+def solution_graded_event_receiver(sender, instance, *args, **kwargs):
+    GradingEvent.objects.status_changed(instance)
+
+solution_graded.connect(solution_graded_event_receiver, sender=Solution)
+
+
+def rank_changed_event_receiver(sender, entry, old_rank, *args, **kwargs):
+    GradingEvent.objects.rank_changed(entry, old_rank)
+
+rank_changed.connect(rank_changed_event_receiver, sender=LeaderboardEntry)
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+from django.db.models import Count, Max
+
+from questions.models import Question, TestCase
+
+
+# One test of a question: the TestCase, its ExpectedOutput (None if it has not been uploaded) and its weight
+PlannedTest = namedtuple('PlannedTest', ['test_case', 'expected_output', 'weight', 'is_sample'])
+
+# Everything the grader needs to judge a submission of a question
+TestPlan = namedtuple('TestPlan', [
+    'question_id', 'version', 'time_limit', 'memory_limit', 'checker', 'float_tolerance', 'policy', 'tests'
+])
+
+
+_plans = {}
+
+
+def get_plan_version(question_id):
+    """
+    Returns a value that changes whenever the question, one of its test cases or one of its expected outputs
+    is added, edited or deleted. Costs a single aggregate query.
+    """
+    version = Question.objects.filter(pk=question_id).aggregate(
+        updated=Max('updated'),
+        test_cases=Count('testcase', distinct=True),
+        test_cases_updated=Max('testcase__updated'),
+        expected_outputs=Count('expectedoutput', distinct=True),
+        expected_outputs_updated=Max('expectedoutput__updated'),
+    )
+    return tuple(sorted(version.items()))
+
+
+def build_plan(question_id, version):
+    test_cases = TestCase.objects.filter(question_id=question_id).select_related(
+        'question'
+    ).prefetch_related('expectedoutput_set')
+
+    tests = []
+    question = None
+    for test_case in test_cases:
+        question = test_case.question
+        expected_outputs = sorted(test_case.expectedoutput_set.all(), key=lambda output: output.file.name)
+        expected_output = expected_outputs[0] if expected_outputs else None
+        tests.append(PlannedTest(test_case, expected_output, test_case.weight, test_case.is_sample))
+    if question is None:
+        question = Question.objects.get(pk=question_id)
+    if question.judging_policy == 'sample_first':
+        # sorted() is stable, so the test cases keep their order within both groups
+        tests = sorted(tests, key=lambda test: not test.is_sample)
+    return TestPlan(
+        question_id, version, question.time_limit, question.memory_limit, question.checker,
+        question.float_tolerance, question.judging_policy, tuple(tests)
+    )
+
+
+def get_test_plan(question_id):
+    """
+    Returns the TestPlan of a question. Plans are kept in memory for as long as the question's version does
+    not change, so grading a submission costs one query for the version check however many tests there are.
+    """
+    version = get_plan_version(question_id)
+    plan = _plans.get(question_id)
+    if plan is None or plan.version != version:
+        plan = build_plan(question_id, version)
+        _plans[question_id] = plan
+    return plan
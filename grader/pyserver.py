@@ -0,0 +1,176 @@
+"""
+Warm interpreter for Python submissions, started by grader/forkserver.py with `python2` or `python3`.
+
+The server imports the modules submissions commonly use once, then reads one JSON request per line from
+stdin. For every request it forks a child that applies the resource limits, redirects stdin and stdout to
+the given files and runs the submission as __main__. The child reports when it is about to run the
+submission, so the time spent forking and setting up is measured separately and is not part of the time
+limit. For every request the server writes two JSON lines on stdout, the pid of the child when it is forked
+and the result when it has finished.
+
+This file must run on Python 2 and 3 and must not import Django.
+"""
+import json
+import math
+import os
+import resource
+import runpy
+import select
+import signal
+import sys
+import time
+
+
+PRELOAD = [
+    'bisect', 'collections', 'copy', 'decimal', 'fractions', 'functools', 'heapq', 'itertools', 'math',
+    'operator', 'random', 're', 'string', 'array',
+]
+
+READY_TIMEOUT = 5  # seconds
+POLL_INTERVAL = 0.005  # seconds
+
+# Exit code of a child whose submission raised MemoryError, reported as out_of_memory
+OUT_OF_MEMORY_EXIT = 102
+
+
+def preload():
+    for name in PRELOAD:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+
+def run_child(request, ready):
+    """ Runs in the forked child, never returns """
+    code = 1
+    try:
+        os.setsid()
+        os.chdir(request['cwd'])
+
+        cpu_limit = int(math.ceil(request['time_limit']))
+        address_space = request['address_space']
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit + 1, cpu_limit + 2))
+        resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (request['output_limit'], request['output_limit']))
+        resource.setrlimit(resource.RLIMIT_NPROC, (request['process_limit'], request['process_limit']))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+        stdin = os.open(request['stdin'], os.O_RDONLY)
+        stdout = os.open(request['stdout'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 420)  # 0644
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(stdin, 0)
+        os.dup2(stdout, 1)
+        os.dup2(devnull, 2)
+        for fd in (stdin, stdout, devnull):
+            os.close(fd)
+        sys.stdin = os.fdopen(0, 'r')
+        sys.stdout = os.fdopen(1, 'w')
+        sys.stderr = os.fdopen(2, 'w')
+        sys.argv = [request['script']]
+        sys.path[0] = request['cwd']
+
+        # Tell the server how much CPU the setup used, the submission starts now
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        os.write(ready, str(usage.ru_utime + usage.ru_stime).encode('ascii'))
+        os.close(ready)
+
+        try:
+            runpy.run_path(request['script'], run_name='__main__')
+            code = 0
+        except MemoryError:
+            code = OUT_OF_MEMORY_EXIT
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                code = 1
+        sys.stdout.flush()
+    except BaseException:
+        pass
+    os._exit(code)
+
+
+def read_peak_kb(pid):
+    """ Returns the peak resident set size of a process in KB, 0 if it cannot be read """
+    try:
+        with open('/proc/{pid}/status'.format(pid=pid)) as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return 0
+
+
+def handle(request, responses):
+    ready_r, ready_w = os.pipe()
+    forked = time.time()
+    pid = os.fork()
+    if pid == 0:
+        os.close(ready_r)
+        run_child(request, ready_w)
+    os.close(ready_w)
+    # The client kills the child's process group with this pid if the server dies while the child runs
+    write_line(responses, {'pid': pid})
+
+    readable, _, _ = select.select([ready_r], [], [], READY_TIMEOUT)
+    setup_cpu = 0.0
+    if readable:
+        message = os.read(ready_r, 64)
+        try:
+            setup_cpu = float(message)
+        except ValueError:
+            pass
+    os.close(ready_r)
+    started = time.time()
+
+    deadline = started + request['time_limit']
+    timed_out = False
+    while True:
+        waited, status, usage = os.wait4(pid, os.WNOHANG)
+        if waited:
+            break
+        timed_out = time.time() > deadline
+        if timed_out or read_peak_kb(pid) > request['memory_limit']:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            waited, status, usage = os.wait4(pid, 0)
+            break
+        time.sleep(POLL_INTERVAL)
+
+    exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else None
+    return {
+        'exit_code': exit_code,
+        'signal': os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+        'timed_out': timed_out,
+        'cpu_time': max(0.0, usage.ru_utime + usage.ru_stime - setup_cpu),
+        'wall_time': time.time() - started,
+        'memory': usage.ru_maxrss,
+        'out_of_memory': exit_code == OUT_OF_MEMORY_EXIT,
+        'startup': started - forked,
+    }
+
+
+def write_line(responses, message):
+    responses.write(json.dumps(message) + '\n')
+    responses.flush()
+
+
+def main():
+    preload()
+    requests = sys.stdin
+    responses = sys.stdout
+    while True:
+        line = requests.readline()
+        if not line:
+            break
+        write_line(responses, handle(json.loads(line), responses))
+
+
+if __name__ == '__main__':
+    main()
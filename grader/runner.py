@@ -0,0 +1,133 @@
+import math
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+
+# Largest file a submission may write, in bytes
+OUTPUT_LIMIT = getattr(settings, 'GRADER_OUTPUT_LIMIT', 64 * 1024 * 1024)
+
+# Processes and threads a submission may have, counted per user running the grader
+PROCESS_LIMIT = getattr(settings, 'GRADER_PROCESS_LIMIT', 64)
+
+# The address space limit is only a guard against runaway allocations, MLE is decided on the resident set size.
+# It is well above the memory limit because virtual memory overstates what a program uses, a program that
+# allocates more than the memory limit and uses it is stopped by the runner and judged MLE.
+ADDRESS_SPACE_FACTOR = 4
+
+# prlimit (util-linux) applies the resource limits and then executes the submission. Limits are not set in a
+# preexec_fn because the runner is called from several threads, where preexec_fn is not safe.
+PRLIMIT = getattr(settings, 'GRADER_PRLIMIT', 'prlimit')
+
+# Messages a program prints when an allocation fails, i.e. when it reached the address space limit
+OUT_OF_MEMORY_MESSAGES = [b'MemoryError', b'std::bad_alloc', b'Cannot allocate memory', b'out of memory']
+STDERR_TAIL = 4096  # bytes of stderr searched for them
+
+POLL_INTERVAL = 0.005  # seconds
+
+# status is one of 'ok', 'tle', 'mle' and 're' (runtime error). Times are in seconds, memory in KB.
+# startup is the time spent starting the process that was not counted against the time limit, if known.
+RunResult = namedtuple('RunResult', ['status', 'exit_code', 'cpu_time', 'wall_time', 'memory', 'startup'])
+
+
+def address_space_limit(memory_limit):
+    """ Address space guard in bytes for a memory limit in MB """
+    return memory_limit * 1024 * 1024 * ADDRESS_SPACE_FACTOR
+
+
+def limit_command(command, time_limit, memory_limit):
+    """ Returns `command` prefixed with the prlimit call that applies the resource limits """
+    cpu_limit = int(math.ceil(time_limit))
+    return [
+        PRLIMIT,
+        '--cpu={soft}:{hard}'.format(soft=cpu_limit + 1, hard=cpu_limit + 2),
+        '--as={limit}'.format(limit=address_space_limit(memory_limit)),
+        '--fsize={limit}'.format(limit=OUTPUT_LIMIT),
+        '--nproc={limit}'.format(limit=PROCESS_LIMIT),
+        '--core=0',
+        '--',
+    ] + list(command)
+
+
+def classify(timed_out, cpu_time, cpu_limit_signal, memory, returncode, time_limit, memory_limit,
+             out_of_memory=False):
+    """
+    Returns the status of a finished run. `out_of_memory` tells that a failed run could not allocate memory,
+    which is judged MLE like a run that used more than the memory limit.
+    """
+    if timed_out or cpu_time > time_limit or cpu_limit_signal:
+        return 'tle'
+    if memory > memory_limit * 1024 or (returncode != 0 and out_of_memory):
+        return 'mle'
+    if returncode != 0:
+        return 're'
+    return 'ok'
+
+
+def read_status_kb(pid, field):
+    """ Returns a memory field of /proc/<pid>/status in KB, None if it cannot be read """
+    try:
+        with open('/proc/{pid}/status'.format(pid=pid)) as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def run(command, stdin, stdout, cwd, time_limit, memory_limit):
+    """
+    Runs `command` with the given open files as stdin and stdout, enforcing `time_limit` (seconds of wall
+    clock and of CPU) and `memory_limit` (MB of resident memory). The CPU time, wall time and peak memory
+    of the process are taken from its rusage.
+
+    ru_maxrss also counts the copy of the grader that is forked before the exec. When it is not larger than
+    the grader's own footprint, the peak is taken from VmHWM, which is sampled while the process runs. The
+    process is killed as soon as a sample exceeds the memory limit.
+    """
+    fork_rss = read_status_kb('self', 'VmRSS') or 0
+    sampled_peak = 0
+    with tempfile.TemporaryFile() as stderr:
+        started = time.time()
+        process = subprocess.Popen(
+            limit_command(command, time_limit, memory_limit), stdin=stdin, stdout=stdout, stderr=stderr, cwd=cwd,
+            start_new_session=True
+        )
+        deadline = started + time_limit
+        timed_out = False
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            sampled_peak = max(sampled_peak, read_status_kb(process.pid, 'VmHWM') or 0)
+            timed_out = time.time() > deadline
+            if timed_out or sampled_peak > memory_limit * 1024:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                pid, status, usage = os.wait4(process.pid, 0)
+                break
+            time.sleep(POLL_INTERVAL)
+        wall_time = time.time() - started
+        # The process has been reaped already, tell Popen so that it does not wait for it again
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+        stderr.seek(max(0, os.fstat(stderr.fileno()).st_size - STDERR_TAIL))
+        errors = stderr.read()
+    out_of_memory = any(message in errors for message in OUT_OF_MEMORY_MESSAGES)
+
+    cpu_time = usage.ru_utime + usage.ru_stime
+    memory = usage.ru_maxrss if usage.ru_maxrss > fork_rss else sampled_peak  # KB on Linux
+    killed_by = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+    result = classify(
+        timed_out, cpu_time, killed_by == signal.SIGXCPU, memory, process.returncode, time_limit, memory_limit,
+        out_of_memory
+    )
+    return RunResult(result, process.returncode, cpu_time, wall_time, memory, None)
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Sent by Solution.grade() after the submission has been evaluated and the user's score updated.
+# score_changed tells whether the user's total score changed.
+solution_graded = Signal(providing_args=['instance', 'score_changed'])
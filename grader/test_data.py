@@ -0,0 +1,65 @@
+import glob
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'code-warrior', 'test-data')
+
+
+class TestDataCache(object):
+    """
+    Local copies of the test case inputs and expected outputs of every question. A file is downloaded from
+    the storage backend (S3 in production) the first time a grader needs it and then read in place by every
+    later run. The `updated` timestamp and the file name are part of the local name, so editing a TestCase or
+    ExpectedOutput in the admin makes the graders fetch the new file.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def directory(self, instance):
+        return os.path.join(self.root, str(instance.question_id), instance._meta.model_name)
+
+    def path(self, instance):
+        version = instance.updated.strftime('%Y%m%d%H%M%S%f')
+        name = '{pk}-{version}-{filename}'.format(pk=instance.pk, version=version, filename=instance.filename)
+        return os.path.join(self.directory(instance), name)
+
+    def fetch(self, instance):
+        """ Returns the path of a local, readable copy of `instance.file` """
+        storage = instance.file.storage
+        try:
+            # Files on the local disk are read where they are
+            return storage.path(instance.file.name)
+        except NotImplementedError:
+            pass
+
+        path = self.path(instance)
+        if os.path.exists(path):
+            return path
+
+        directory = self.directory(instance)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as local_file, storage.open(instance.file.name, 'rb') as remote_file:
+                shutil.copyfileobj(remote_file, local_file)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        # Remove the copies of older versions of the same file
+        for stale in glob.glob(os.path.join(directory, '{pk}-*'.format(pk=instance.pk))):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        return path
+
+
+test_data_cache = TestDataCache(getattr(settings, 'GRADER_TEST_DATA_DIR', DEFAULT_CACHE_DIR))
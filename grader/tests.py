@@ -1,3 +1,567 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import LeaderboardEntry
+from judge.testcases import QueryPlanTestCase
+from questions.models import ExpectedOutput, Question, TestCase as QuestionTestCase
+
+from . import checkers, compile_cache, events, forkserver, plan, runner, worker
+from .checkers import Mismatch
+from .compile_cache import CompileCache
+from .export import export
+from .models import BestScore, Solution
+from .test_data import TestDataCache
+
+
+class QueryPlanTests(QueryPlanTestCase):
+
+    def setUp(self):
+        super(QueryPlanTests, self).setUp()
+        Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+
+    def test_user_question_submissions(self):
+        self.assertUsesIndex(Solution.objects.get_by_user_question('alice', 'ADD'), ordered=True)
+
+    def test_grading_queue(self):
+        self.assertUsesIndex(Solution.objects.queued().order_by('timestamp'), ordered=True)
+
+    def test_best_score(self):
+        self.assertUsesIndex(BestScore.objects.filter(user_id=1, question_id=1))
+        self.assertUsesIndex(BestScore.objects.filter(user_id=1))
+
+
+class CheckerTests(SimpleTestCase):
+
+    def compare(self, checker, answer, expected, tolerance=1e-6):
+        answer, expected = io.BytesIO(answer), io.BytesIO(expected)
+        if checker == 'exact':
+            return checkers.compare_exact(answer, expected)
+        if checker == 'float':
+            return checkers.compare_tokens(answer, expected, equal=checkers.float_equal(tolerance))
+        return checkers.compare_tokens(answer, expected, newlines=checker == 'whitespace')
+
+    def test_exact(self):
+        self.assertIsNone(self.compare('exact', b'1 2\n3\n', b'1 2\n3\n'))
+        self.assertEqual(self.compare('exact', b'1 2\n4\n', b'1 2\n3\n'), Mismatch(2, 1, 'wrong answer'))
+        self.assertEqual(self.compare('exact', b'1 2\n', b'1 2\n3\n'), Mismatch(2, 1, 'output ended early'))
+        self.assertEqual(self.compare('exact', b'1 2\n3', b'1 2\n'), Mismatch(2, 1, 'unexpected extra output'))
+
+    def test_whitespace(self):
+        self.assertIsNone(self.compare('whitespace', b'1   2 \n3\n\n\n', b'1 2\n3'))
+        self.assertEqual(self.compare('whitespace', b'1\n2 3\n', b'1 2\n3\n'), Mismatch(1, 2, 'line ended early'))
+        self.assertEqual(self.compare('whitespace', b'1 2 3\n', b'1 2\n3\n'), Mismatch(1, 5, 'line is too long'))
+        self.assertEqual(self.compare('whitespace', b'1 2\n3 5\n', b'1 2\n3 4\n'), Mismatch(2, 3, 'wrong answer'))
+        self.assertEqual(self.compare('whitespace', b'1 2\n3\n4\n', b'1 2\n3\n'),
+                         Mismatch(3, 1, 'unexpected extra output'))
+
+    def test_output_ended_early_at_the_end_of_the_output(self):
+        self.assertEqual(self.compare('whitespace', b'1 2\n', b'1 2\n3\n'), Mismatch(2, 1, 'output ended early'))
+        self.assertEqual(self.compare('tokens', b'1 2\n', b'1 2\n3\n'), Mismatch(2, 1, 'output ended early'))
+        self.assertEqual(self.compare('tokens', b'1 2', b'1 2 3'), Mismatch(1, 4, 'output ended early'))
+        self.assertEqual(self.compare('tokens', b'', b'1'), Mismatch(1, 1, 'output ended early'))
+
+    def test_tokens_ignore_line_breaks(self):
+        self.assertIsNone(self.compare('tokens', b'1\n2\n3', b'1 2 3\n'))
+        self.assertEqual(self.compare('tokens', b'1\n2\n4', b'1 2 3\n'), Mismatch(3, 1, 'wrong answer'))
+
+    def test_float(self):
+        self.assertIsNone(self.compare('float', b'0.3333334 2\n', b'0.3333333 2.0\n'))
+        self.assertIsNone(self.compare('float', b'nan inf', b'nan inf'))
+        self.assertEqual(self.compare('float', b'0.34', b'0.33', tolerance=1e-3), Mismatch(1, 1, 'wrong answer'))
+        self.assertEqual(self.compare('float', b'1e9 x', b'1e9 y'), Mismatch(1, 5, 'wrong answer'))
+
+    def test_tokens_across_chunks(self):
+        with mock.patch.object(checkers, 'CHUNK_SIZE', 3):
+            self.assertIsNone(self.compare('whitespace', b'12345 678\n9\n', b'12345 678\n9'))
+            self.assertEqual(self.compare('whitespace', b'12345 679\n', b'12345 678\n'),
+                             Mismatch(1, 7, 'wrong answer'))
+            self.assertEqual(self.compare('exact', b'12345 679\n', b'12345 678\n'), Mismatch(1, 9, 'wrong answer'))
+
+
+class CompileCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = CompileCache(os.path.join(self.root, 'cache'), max_size=25)
+
+    def binary(self, content):
+        path = os.path.join(self.root, 'binary')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_hit_and_miss(self):
+        destination = os.path.join(self.root, 'out')
+        self.assertFalse(self.cache.get('abc', destination))
+        self.cache.put('abc', self.binary(b'compiled'))
+        self.assertTrue(self.cache.get('abc', destination))
+        with open(destination, 'rb') as f:
+            self.assertEqual(f.read(), b'compiled')
+
+    def test_key_depends_on_compiler_and_command(self):
+        command = ['gcc', '-O2', 'main.c']
+        with mock.patch.object(compile_cache, 'compiler_version', return_value='gcc 7.5.0'):
+            key = self.cache.key('hash', 'c', command)
+            self.assertEqual(self.cache.key('hash', 'c', list(command)), key)
+            self.assertNotEqual(self.cache.key('hash', 'c', ['gcc', '-O0', 'main.c']), key)
+            self.assertNotEqual(self.cache.key('other', 'c', command), key)
+            self.assertNotEqual(self.cache.key('hash', 'cpp', command), key)
+        with mock.patch.object(compile_cache, 'compiler_version', return_value='gcc 9.4.0'):
+            self.assertNotEqual(self.cache.key('hash', 'c', command), key)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        now = time.time()
+        for age, key in enumerate(['old', 'used', 'new']):
+            self.cache.put(key, self.binary(b'0123456789'))
+            os.utime(self.cache.path(key), (now - 100 + age, now - 100 + age))
+        # Three entries of 10 bytes do not fit in 25, the oldest one went when the third was added
+        self.assertEqual(sorted(os.listdir(self.cache.root)), ['new', 'used'])
+
+        self.assertTrue(self.cache.get('used', os.path.join(self.root, 'out')))
+        self.cache.put('newest', self.binary(b'0123456789'))
+        self.assertEqual(sorted(os.listdir(self.cache.root)), ['newest', 'used'])
+
+
+class RemoteStorage(Storage):
+    """ Storage without local paths, like S3, that counts the files it opens """
+
+    def __init__(self, files):
+        self.files = files
+        self.opened = []
+
+    def _open(self, name, mode='rb'):
+        self.opened.append(name)
+        return ContentFile(self.files[name], name=name)
+
+    def exists(self, name):
+        return name in self.files
+
+
+class TestDataCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = TestDataCache(self.root)
+        self.storage = RemoteStorage({'testcases/ADD/in1.txt': b'1 1\n'})
+
+    def remote_test_case(self, updated):
+        return SimpleNamespace(
+            pk=5, question_id=1, filename='in1.txt', updated=updated, _meta=SimpleNamespace(model_name='testcase'),
+            file=SimpleNamespace(name='testcases/ADD/in1.txt', storage=self.storage)
+        )
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_remote_file_is_downloaded_once(self):
+        test_case = self.remote_test_case(timezone.now())
+        path = self.cache.fetch(test_case)
+        self.assertEqual(self.cache.fetch(test_case), path)
+        self.assertEqual(self.read(path), b'1 1\n')
+        self.assertEqual(self.storage.opened, ['testcases/ADD/in1.txt'])
+
+    def test_newer_version_replaces_the_stale_copy(self):
+        updated = timezone.now()
+        stale = self.cache.fetch(self.remote_test_case(updated))
+        self.storage.files['testcases/ADD/in1.txt'] = b'2 2\n'
+        path = self.cache.fetch(self.remote_test_case(updated + timedelta(seconds=1)))
+        self.assertNotEqual(path, stale)
+        self.assertEqual(self.read(path), b'2 2\n')
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+        self.assertEqual(len(self.storage.opened), 2)
+
+
+class TestPlanTests(TestCase):
+
+    def setUp(self):
+        self.question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        self.addCleanup(plan._plans.clear)
+        self.add_test_cases(2)
+
+    def add_test_cases(self, count):
+        for i in range(QuestionTestCase.objects.count(), QuestionTestCase.objects.count() + count):
+            test_case = QuestionTestCase.objects.create(question=self.question, file='in{0}.txt'.format(i))
+            ExpectedOutput.objects.create(question=self.question, test_case=test_case, file='out{0}.txt'.format(i))
+
+    def test_queries_do_not_depend_on_the_number_of_tests(self):
+        with self.assertNumQueries(3):
+            self.assertEqual(len(plan.get_test_plan(self.question.pk).tests), 2)
+        with self.assertNumQueries(1):
+            plan.get_test_plan(self.question.pk)
+
+        self.add_test_cases(8)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(plan.get_test_plan(self.question.pk).tests), 10)
+        with self.assertNumQueries(1):
+            plan.get_test_plan(self.question.pk)
+
+
+class SubmissionTestCase(TestCase):
+    """ Stores uploads in a temporary MEDIA_ROOT and creates alice and the question ADD """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user('alice', 'alice@example.com', password='secret')
+        self.question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+
+    def submit(self, source, name='ADD.c', language='c'):
+        return Solution.objects.create(
+            question=self.question, user=self.user, language=language, file=SimpleUploadedFile(name, source)
+        )
+
+
+class SubmissionStorageTests(SubmissionTestCase):
+
+    def test_submissions_are_stored_under_their_hash(self):
+        source_hash = hashlib.sha256(b'int main() {}').hexdigest()
+        solution = self.submit(b'int main() {}')
+        self.assertEqual(solution.source_hash, source_hash)
+        self.assertEqual(solution.file.name, 'submissions/{0}/{1}.c'.format(source_hash[:2], source_hash))
+        with solution.file.storage.open(solution.file.name, 'rb') as f:
+            self.assertEqual(f.read(), b'int main() {}')
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.submit(b'int main() {}')
+        second = self.submit(b'int main() {}', name='solution.c')
+        other = self.submit(b'int main() { return 0; }')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        directory = first.file.storage.path('submissions/' + first.source_hash[:2])
+        self.assertEqual(os.listdir(directory), [os.path.basename(first.file.name)])
+
+
+class ParallelTestRunTests(SimpleTestCase):
+    """ Solution.run_tests() with run_test() replaced by a fake that finishes the later tests first """
+
+    def run_tests(self, verdicts, stop_on_failure=False, concurrency=4):
+        started = []
+
+        def run_test(solution, workdir, index, test, plan):
+            started.append(index)
+            time.sleep(0.02 * (len(verdicts) - index))
+            return verdicts[index], 'test {index}'.format(index=index), None
+
+        with mock.patch.object(Solution, 'run_test', run_test):
+            results = Solution().run_tests('/tmp', list(range(len(verdicts))), None, concurrency,
+                                           stop_on_failure=stop_on_failure)
+        return results, started
+
+    def test_results_are_in_test_order(self):
+        results, started = self.run_tests(['ac', 'wa', 'ac', 'tle'])
+        self.assertEqual([verdict for verdict, detail, run in results], ['ac', 'wa', 'ac', 'tle'])
+        self.assertEqual([detail for verdict, detail, run in results], ['test 0', 'test 1', 'test 2', 'test 3'])
+
+    def test_stop_on_failure_ends_at_the_first_failed_test(self):
+        # The third test fails first, the second one fails later and is the first failure in test order
+        results, started = self.run_tests(['ac', 'wa', 'wa', 'ac'], stop_on_failure=True)
+        self.assertEqual([verdict for verdict, detail, run in results], ['ac', 'wa'])
+
+    def test_tests_after_a_failure_are_not_started(self):
+        results, started = self.run_tests(['wa', 'ac', 'ac', 'ac'], stop_on_failure=True, concurrency=1)
+        self.assertEqual([verdict for verdict, detail, run in results], ['wa'])
+        self.assertEqual(started, [0])
+
+
+class QueueTests(SubmissionTestCase):
+
+    def test_claims_oldest_submission_once(self):
+        first = self.submit(b'int main() {}')
+        second = self.submit(b'int main() { return 0; }')
+        self.assertEqual(Solution.objects.claim_next().pk, first.pk)
+        self.assertEqual(Solution.objects.claim_next().pk, second.pk)
+        self.assertIsNone(Solution.objects.claim_next())
+        self.assertEqual(Solution.objects.filter(status='running').count(), 2)
+
+    def test_submission_claimed_by_another_worker_is_skipped(self):
+        first = self.submit(b'int main() {}')
+        second = self.submit(b'int main() { return 0; }')
+        def read_before_another_worker_claimed():
+            # The candidates still include the first submission, which another worker claims now
+            Solution.objects.filter(pk=first.pk).update(status='running')
+            return Solution.objects.get_queryset()
+
+        with mock.patch.object(Solution.objects, 'queued', side_effect=read_before_another_worker_claimed):
+            self.assertEqual(Solution.objects.claim_next().pk, second.pk)
+
+    def test_requeue_stale(self):
+        solution = self.submit(b'int main() {}')
+        Solution.objects.claim_next()
+        self.assertEqual(Solution.objects.requeue_stale(3600), 0)
+        Solution.objects.filter(pk=solution.pk).update(started=timezone.now() - timedelta(hours=2))
+        self.assertEqual(Solution.objects.requeue_stale(3600), 1)
+        self.assertEqual(Solution.objects.claim_next().pk, solution.pk)
+
+    def test_worker_requeues_abandoned_submissions(self):
+        solution = self.submit(b'int main() {}')
+        Solution.objects.claim_next()
+        Solution.objects.filter(pk=solution.pk).update(started=timezone.now() - timedelta(hours=2))
+        stdout = io.StringIO()
+        with mock.patch.object(Solution, 'grade', autospec=True) as grade:
+            worker.run_worker(stdout, io.StringIO(), once=True, requeue_after=3600)
+        self.assertEqual([call[0][0].pk for call in grade.call_args_list], [solution.pk])
+        self.assertIn('Requeued 1 abandoned submission(s)', stdout.getvalue())
+
+    def test_rejudge(self):
+        failed = self.submit(b'int main() {}')
+        graded = self.submit(b'int main() { return 0; }')
+        Solution.objects.filter(pk=failed.pk).update(status='error', started=timezone.now())
+        Solution.objects.filter(pk=graded.pk).update(status='graded', result='ac')
+        self.assertEqual(Solution.objects.all().rejudge(), 1)
+        self.assertEqual(Solution.objects.claim_next().pk, failed.pk)
+        self.assertIsNone(Solution.objects.claim_next())
+
+    def test_submitted_solution_is_saved_once(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(Solution, 'save', autospec=True, side_effect=Solution.save) as save:
+            self.client.post(reverse('grader:submit', kwargs={'code': 'ADD'}), {
+                'file': SimpleUploadedFile('ADD.c', b'int main() {}'), 'language': 'c'
+            })
+        self.assertEqual(save.call_count, 1)
+
+
+class BestScoreTests(SubmissionTestCase):
+
+    def graded(self, result, score, minutes):
+        solution = Solution.objects.create(
+            question=self.question, user=self.user, file='submissions/alice/ADD.c', language='c',
+            status='graded', result=result, score=score
+        )
+        solution.timestamp = timezone.now() + timedelta(minutes=minutes)
+        return solution
+
+    def test_only_improvements_are_added(self):
+        self.assertEqual(self.graded('pc', 20, 1).award_score(), 20)
+        self.assertEqual(self.graded('pc', 10, 2).award_score(), 0)
+        self.assertEqual(self.graded('pc', 20, 3).award_score(), 0)
+        self.assertEqual(self.graded('ac', 30, 4).award_score(), 10)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.score, 30)
+
+        best = BestScore.objects.get()
+        self.assertEqual((best.best_score, best.attempts), (30, 4))
+
+    def test_best_score_keeps_the_earliest_submission(self):
+        first = self.graded('pc', 20, 1)
+        first.award_score()
+        self.graded('pc', 20, 5).award_score()
+        self.graded('pc', 10, 6).award_score()
+        self.assertEqual(BestScore.objects.get().best_timestamp, first.timestamp)
+
+    def test_failed_submissions_are_not_recorded(self):
+        for result in ['wa', 'tle', 'mle', 'sigabrt', 'cte']:
+            self.assertEqual(self.graded(result, 0, 1).award_score(), 0)
+        self.assertFalse(BestScore.objects.exists())
+
+
+class ExportTests(SubmissionTestCase):
+
+    def setUp(self):
+        super(ExportTests, self).setUp()
+        get_user_model().objects.filter(pk=self.user.pk).update(score=30, total_time=120)
+        LeaderboardEntry.objects.rebuild()
+        self.best_timestamp = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+        BestScore.objects.create(user=self.user, question=self.question, best_score=30,
+                                 best_timestamp=self.best_timestamp, attempts=2)
+
+    def test_csv(self):
+        lines = ''.join(export('leaderboard', 'csv')).splitlines()
+        self.assertEqual(lines, ['rank,username,score,total_time', '1,alice,30,120'])
+
+    def test_ndjson_datetimes_are_iso_8601(self):
+        lines = list(export('best_scores', 'ndjson'))
+        self.assertEqual([json.loads(line) for line in lines], [{
+            'username': 'alice', 'question': 'ADD', 'best_score': 30,
+            'best_timestamp': '2026-10-18T12:30:00+00:00', 'attempts': 2
+        }])
+
+    def test_command(self):
+        solution = self.submit(b'int main() {}')
+        stdout = io.StringIO()
+        call_command('export_results', 'submissions', stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], 'id,username,question,language,status,result,score,timestamp,max_cpu_time,'
+                                   'max_wall_time,max_memory')
+        self.assertEqual(lines[1].split(',')[:7], [str(solution.pk), 'alice', 'ADD', 'c', 'queued', '', '0'])
+        self.assertEqual(len(lines), 2)
+
+    def test_view_is_for_staff_only(self):
+        url = reverse('grader:export', kwargs={'name': 'leaderboard', 'export_format': 'ndjson'})
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/admin/login/', response['Location'])
+
+        staff = get_user_model().objects.create_staffuser('bob', 'bob@example.com', password='secret')
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="leaderboard.ndjson"')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['alice', 'bob'])
+
+
+class GradingTests(SubmissionTestCase):
+    """ Grades Python submissions of ADD (print the sum of two numbers) against three test cases """
+
+    # Right on the first test case only
+    FIRST_ONLY = b'a, b = map(int, input().split())\nprint(a + b if a == 1 else 0)\n'
+    # Right on the first two test cases
+    FIRST_TWO = b'a, b = map(int, input().split())\nprint(a + b if a <= 2 else 0)\n'
+    ALL = b'a, b = map(int, input().split())\nprint(a + b)\n'
+
+    def setUp(self):
+        super(GradingTests, self).setUp()
+        for i in range(1, 4):
+            test_case = QuestionTestCase(question=self.question, is_sample=i == 1)
+            test_case.file.save('in{0}.txt'.format(i), ContentFile('{0} {0}\n'.format(i)))
+            expected = ExpectedOutput(question=self.question, test_case=test_case)
+            expected.file.save('out{0}.txt'.format(i), ContentFile('{0}\n'.format(2 * i)))
+
+    def grade(self, source, policy='full'):
+        self.question.judging_policy = policy
+        self.question.save()
+        solution = self.submit(source, name='ADD.py', language='py3')
+        solution.grade(concurrency=1)
+        self.user.refresh_from_db()
+        return solution
+
+    def test_full_policy_awards_partial_score(self):
+        solution = self.grade(self.FIRST_TWO)
+        self.assertEqual((solution.result, solution.score), ('pc', 20))
+        self.assertEqual(self.user.score, 20)
+
+    def test_fail_fast_scores_nothing(self):
+        solution = self.grade(self.FIRST_ONLY, policy='fail_fast')
+        self.assertEqual((solution.result, solution.score), ('wa', 0))
+        self.assertFalse(BestScore.objects.exists())
+
+        # A later partial score still counts in full
+        self.grade(self.FIRST_TWO)
+        self.assertEqual(self.user.score, 20)
+        self.assertEqual(BestScore.objects.get().best_score, 20)
+
+    def test_result_is_not_saved_without_the_score(self):
+        solution = self.submit(self.ALL, name='ADD.py', language='py3')
+        with mock.patch.object(Solution, 'award_score', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                solution.grade(concurrency=1)
+        solution.refresh_from_db()
+        self.assertEqual((solution.status, solution.result), ('queued', None))
+
+    def test_sample_first_stops_at_a_failed_sample(self):
+        solution = self.grade(b'print(0)\n', policy='sample_first')
+        self.assertEqual((solution.result, solution.score), ('wa', 0))
+        self.assertTrue(solution.detail.startswith('in1.txt'))
+
+        solution = self.grade(self.FIRST_ONLY, policy='sample_first')
+        self.assertEqual((solution.result, solution.score), ('pc', 10))
+        solution = self.grade(self.ALL, policy='sample_first')
+        self.assertEqual((solution.result, solution.score), ('ac', 30))
+        self.assertEqual(self.user.score, 30)
+
+
+class RunnerTests(SimpleTestCase):
+    """ Runs small Python programs under a 32 MB memory limit """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+
+    def run_python(self, source, time_limit=1, memory_limit=32):
+        with open(os.devnull, 'rb') as stdin, open(os.path.join(self.workdir, 'output.txt'), 'wb') as stdout:
+            return runner.run(['python3', '-c', source], stdin, stdout, self.workdir, time_limit, memory_limit)
+
+    def test_verdicts(self):
+        self.assertEqual(self.run_python('print(1)').status, 'ok')
+        self.assertEqual(self.run_python('raise SystemExit(3)').status, 're')
+        self.assertEqual(self.run_python('while True: pass').status, 'tle')
+
+    def test_using_more_than_the_memory_limit_is_mle(self):
+        run = self.run_python('x = bytearray(64 * 1024 * 1024)')
+        self.assertEqual(run.status, 'mle')
+        self.assertGreater(run.memory, 32 * 1024)
+
+    def test_failed_allocation_is_mle(self):
+        # Larger than the address space guard, the allocation fails with MemoryError
+        self.assertEqual(self.run_python('x = bytearray(1024 * 1024 * 1024)').status, 'mle')
+
+
+class ForkServerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.stdin = os.path.join(self.workdir, 'input.txt')
+        open(self.stdin, 'w').close()
+
+    def run_script(self, source):
+        script = os.path.join(self.workdir, 'solution.py')
+        with open(script, 'w') as f:
+            f.write(source)
+        output = os.path.join(self.workdir, 'output.txt')
+        return forkserver.run('python3', script, self.stdin, output, self.workdir, 1, 64)
+
+    def test_killing_the_server_is_a_runtime_error(self):
+        self.assertEqual(self.run_script('import os\nos.kill(os.getppid(), 9)\n').status, 're')
+        # The next run gets a new server
+        self.assertEqual(self.run_script('print(1)\n').status, 'ok')
+
+    def test_dead_interpreter_frees_its_place(self):
+        pool = forkserver.InterpreterPool('python3', 1)
+        interpreter = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        interpreter.close()
+        pool.release(interpreter)
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertTrue(acquired[0].alive)
+        acquired[0].close()
+
+
+class EventStreamTests(TestCase):
+
+    def test_leaderboard_events_need_a_login(self):
+        response = self.client.get(reverse('leaderboard-events'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_streams_are_capped(self):
+        self.client.force_login(get_user_model().objects.create_user('alice', 'alice@example.com', 'secret'))
+        url = reverse('leaderboard-events')
+        with mock.patch.object(events.broadcaster, 'max_listeners', 1), \
+                mock.patch.object(events.broadcaster, 'poll_interval', 0.01):
+            first = self.client.get(url)
+            self.assertTrue(first.streaming)
+            self.assertEqual(self.client.get(url).status_code, 204)
+            first.close()
+            second = self.client.get(url)
+            self.assertTrue(second.streaming)
+            second.close()
+        self.assertEqual(events.broadcaster.listeners, 0)
@@ -1,10 +1,13 @@
 from django.conf.urls import url
 
-from .views import submit_solution, check_solution, PreviousSubmission
+from .views import submit_solution, check_solution, submission_events, export_results, PreviousSubmission
 
 
 urlpatterns = [
     url(r'^(?P<code>[A-Z]+)/submit/$', submit_solution, name='submit'),
     url(r'^(?P<code>[A-Z]+)/grade/(?P<pk>\d+)$', check_solution, name='grade'),
+    url(r'^(?P<code>[A-Z]+)/grade/(?P<pk>\d+)/events/$', submission_events, name='grade-events'),
     url(r'^(?P<code>[A-Z]+)/submissions/$', PreviousSubmission.as_view(), name='previous_submissions'),
+    url(r'^export/(?P<name>leaderboard|best_scores|submissions)\.(?P<export_format>csv|ndjson)$', export_results,
+        name='export'),
 ]
@@ -1,15 +1,21 @@
+import json
 from datetime import datetime
 from datetime import timedelta
 
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from django.http import Http404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView
 from django.contrib.auth import get_user_model
 
+from .events import format_event, stream
+from .export import export
 from .forms import SolutionForm
 from .models import Solution
+from accounts.models import LeaderboardEntry
+from judge.aws.download.utils import AWSDownload
 from questions.models import Question
 from grader.util import start_time
 
@@ -22,7 +28,7 @@ def submit_solution(request, code):
         current_time = datetime.now()
         future = start_time+timedelta(hours=100000)
         if current_time > future:
-            data = User.objects.all()
+            data = LeaderboardEntry.objects.page()
             username = request.user.username
             return render(request, 'accounts/leaderboard.html', {
                 'object_list': data, 'msg': 'Contest has ended', 'username': username
@@ -30,11 +36,12 @@ def submit_solution(request, code):
         form = SolutionForm(request.POST, request.FILES)
         if form.is_valid():
             instance = form.save(commit=False)
-            instance.question = Question.objects.get_by_code(code)
+            instance.question = Question.objects.get_by_code(code)  # the upload path needs the code
+            if instance.question is None:
+                raise Http404('Question not found')
             instance.user = request.user
             instance.language = request.POST.get('language')
             instance.save()
-            form.save()
             return redirect(reverse('grader:grade', kwargs={'code': code, 'pk': instance.pk}))
     else:
         form = SolutionForm()
@@ -49,29 +56,65 @@ def check_solution(request, code, pk):
     if submission is None:
         raise Http404
 
-    if submission.result is None:
-        # run submission
-        submission.evaluate()
-
-        if submission.result == 'ac' or submission.result == 'pc':
-            previous_max_submission = qs.exclude(pk=submission.id).first()
-            if previous_max_submission is not None:
-                score_diff = submission.score - previous_max_submission.score
-                if score_diff > 0:
-                    time_diff_up = (submission.timestamp-previous_max_submission.timestamp).total_seconds()
-                    submission.user.increment_score(score_diff)
-                    submission.user.increment_time(time_diff_up)
-            else:
-                time_diff = (datetime.now() - start_time).total_seconds()
-                submission.user.increment_score(submission.score)
-                submission.user.increment_time(time_diff)
-
+    # Submissions are graded by the `grade_submissions` worker, the result page keeps polling until then
     return render(request, 'grader/result.html', {
+        'code': code,
+        'pk': submission.pk,
+        'status': submission.status,
+        'pending': submission.is_pending,
         'result': submission.result,
         'score': submission.score
     })
 
 
+def event_stream_response(events):
+    if events is None:
+        # Too many open streams, 204 tells the browser not to reconnect and the page polls instead
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # tells proxies not to buffer the stream
+    return response
+
+
+def get_last_event_id(request):
+    """ Id of the last event the browser received before it reconnected """
+    try:
+        return int(request.META.get('HTTP_LAST_EVENT_ID'))
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+def submission_events(request, code, pk):
+    """ Streams the status changes of a submission, starting with its current status """
+    qs = Solution.objects.get_by_user_question(request.user.username, code)
+    submission = qs.filter(pk=pk).first()
+    if submission is None:
+        raise Http404
+    initial = format_event('status', json.dumps(submission.status_data))
+    return event_stream_response(stream(
+        lambda event: event.kind == 'status' and event.solution_id == submission.pk,
+        get_last_event_id(request),
+        initial
+    ))
+
+
+@login_required
+def leaderboard_events(request):
+    """ Streams the rank changes of the leaderboard """
+    return event_stream_response(stream(lambda event: event.kind == 'rank', get_last_event_id(request)))
+
+
+@staff_member_required
+def export_results(request, name, export_format):
+    """ Streams the leaderboard, the best scores or all submissions as CSV or NDJSON, for the organisers """
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export(name, export_format), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{name}.{ext}"'.format(name=name, ext=export_format)
+    return response
+
+
 class PreviousSubmission(ListView):
     template_name = 'grader/previous_submission.html'
 
@@ -79,3 +122,21 @@ class PreviousSubmission(ListView):
         request = self.request
         code = self.kwargs.get('code')
         return Solution.objects.get_by_user_question(request.user.username, code)
+
+    def get_context_data(self, **kwargs):
+        context = super(PreviousSubmission, self).get_context_data(**kwargs)
+        submissions = list(context['object_list'])
+        download = AWSDownload.from_settings()
+        if download is None:
+            urls = [submission.get_absolute_url() for submission in submissions]
+        else:
+            # Presigned in one go with the shared client, without a request to S3 per file. Files are stored
+            # under their hash, they are downloaded as <question code>.<ext>
+            urls = download.generate_urls(
+                [submission.file.name for submission in submissions],
+                new_filenames=[self.kwargs.get('code')] * len(submissions)
+            )
+        for submission, url in zip(submissions, urls):
+            submission.download_url = url
+        context['object_list'] = submissions
+        return context
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import time
+import traceback
+
+from django import db
+from django.conf import settings
+
+from .models import GradingEvent, Solution
+
+
+# Seconds grading events are kept for the live pages, and how often the old ones are deleted
+EVENT_MAX_AGE = getattr(settings, 'GRADER_EVENT_MAX_AGE', 3600)
+EVENT_PRUNE_INTERVAL = 60
+
+# Seconds after which a running submission is considered abandoned by its worker, and how often they are requeued
+REQUEUE_AFTER = getattr(settings, 'GRADER_REQUEUE_AFTER', 600)
+REQUEUE_INTERVAL = 60
+
+
+def requeue_stale(stdout, requeue_after):
+    requeued = Solution.objects.requeue_stale(requeue_after)
+    if requeued:
+        stdout.write('Requeued {count} abandoned submission(s)'.format(count=requeued))
+
+
+def run_worker(stdout, stderr, once=False, poll_interval=1.0, concurrency=None, requeue_after=REQUEUE_AFTER):
+    """
+    Claims and grades queued submissions until the queue is empty (once=True) or forever. `concurrency` is
+    the number of test cases of a submission that are run at the same time. Submissions left running for
+    `requeue_after` seconds by a worker that died are put back in the queue.
+    """
+    last_pruned = 0
+    last_requeued = 0
+    while True:
+        # Pruned between submissions too, the table would grow for as long as the queue is never empty
+        if time.time() - last_pruned > EVENT_PRUNE_INTERVAL:
+            GradingEvent.objects.prune(EVENT_MAX_AGE)
+            last_pruned = time.time()
+        if time.time() - last_requeued > REQUEUE_INTERVAL:
+            requeue_stale(stdout, requeue_after)
+            last_requeued = time.time()
+
+        submission = Solution.objects.claim_next()
+        if submission is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            submission.grade(concurrency)
+        except Exception:
+            stderr.write(traceback.format_exc())
+            Solution.objects.filter(pk=submission.pk).update(status='error')
+            submission.status = 'error'
+            GradingEvent.objects.status_changed(submission)
+            continue
+        stdout.write('[{pid}] {submission} ({pk}): {result}'.format(
+            pid=os.getpid(), submission=submission, pk=submission.pk, result=submission.result
+        ))
+
+
+def _worker_process(stdout, stderr, once, poll_interval, concurrency, requeue_after):
+    try:
+        run_worker(stdout, stderr, once=once, poll_interval=poll_interval, concurrency=concurrency,
+                   requeue_after=requeue_after)
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool(object):
+    """
+    Runs `size` grading workers in separate processes. Every worker claims submissions independently, so
+    the pool grades up to `size` submissions at the same time, one per CPU core by default.
+    """
+
+    def __init__(self, size, stdout, stderr, once=False, poll_interval=1.0, concurrency=None,
+                 requeue_after=REQUEUE_AFTER):
+        self.size = size
+        self.concurrency = concurrency
+        self.requeue_after = requeue_after
+        self.stdout = stdout
+        self.stderr = stderr
+        self.once = once
+        self.poll_interval = poll_interval
+        self.processes = []
+
+    def spawn(self):
+        # Database connections must not be shared between the parent and the forked workers
+        db.connections.close_all()
+        process = multiprocessing.Process(
+            target=_worker_process,
+            args=(self.stdout, self.stderr, self.once, self.poll_interval, self.concurrency, self.requeue_after)
+        )
+        process.daemon = True
+        process.start()
+        return process
+
+    def run(self):
+        if self.size <= 1:
+            return run_worker(self.stdout, self.stderr, once=self.once, poll_interval=self.poll_interval,
+                              concurrency=self.concurrency, requeue_after=self.requeue_after)
+
+        self.processes = [self.spawn() for _ in range(self.size)]
+        try:
+            while self.processes:
+                alive = []
+                for process in self.processes:
+                    process.join(timeout=self.poll_interval / len(self.processes))
+                    if process.is_alive():
+                        alive.append(process)
+                    elif not self.once:
+                        # A worker only exits on its own when it crashed, so replace it
+                        self.stderr.write('Worker {pid} exited with code {code}, restarting'.format(
+                            pid=process.pid, code=process.exitcode
+                        ))
+                        # The submission it was grading stays running until it is old enough to be requeued
+                        requeue_stale(self.stdout, self.requeue_after)
+                        alive.append(self.spawn())
+                self.processes = alive
+        finally:
+            for process in self.processes:
+                process.terminate()
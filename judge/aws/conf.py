@@ -26,6 +26,9 @@ AWS_QUERYSTRING_AUTH = False
 DEFAULT_FILE_STORAGE = 'judge.aws.utils.MediaRootS3BotoStorage'
 STATICFILES_STORAGE = 'judge.aws.utils.StaticRootS3BotoStorage'
 S3DIRECT_REGION = 'ap-south-1'
+AWS_S3_REGION_NAME = S3DIRECT_REGION
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')  # e.g. a local S3 compatible server
+AWS_MEDIA_LOCATION = 'media'
 S3_URL = '//%s.s3.amazonaws.com/' % AWS_STORAGE_BUCKET_NAME
 MEDIA_URL = '//%s.s3.amazonaws.com/media/' % AWS_STORAGE_BUCKET_NAME
 MEDIA_ROOT = MEDIA_URL
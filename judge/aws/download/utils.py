@@ -1,9 +1,43 @@
-import boto
 import re
 import os
+import threading
 
+import boto3
+from botocore.config import Config
 from django.conf import settings
-from boto.s3.connection import OrdinaryCallingFormat
+
+
+# Connections kept open by the shared client, one per thread that talks to S3 at the same time
+MAX_POOL_CONNECTIONS = getattr(settings, 'AWS_MAX_POOL_CONNECTIONS', 10)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(access_key, secret_key, region, endpoint_url=None):
+    """
+    Returns the S3 client of the process for the given credentials. Clients are thread-safe and keep a
+    pool of connections, so one is created per process instead of one per request.
+    """
+    identity = (access_key, secret_key, region, endpoint_url)
+    with _clients_lock:
+        if identity not in _clients:
+            # Sessions are not thread-safe, every client gets its own
+            session = boto3.session.Session(
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region
+            )
+            _clients[identity] = session.client(
+                's3',
+                endpoint_url=endpoint_url,
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    s3={'addressing_style': 'path'}
+                )
+            )
+        return _clients[identity]
 
 
 class AWSDownload(object):
@@ -11,35 +45,37 @@ class AWSDownload(object):
     secret_key = None
     bucket = None
     region = None
+    endpoint_url = None
+    location = ''  # folder of the files inside the bucket
     expires = getattr(settings, 'AWS_DOWNLOAD_EXPIRE', 5000)
 
-    def __init__(self,  access_key, secret_key, bucket, region, *args, **kwargs):
+    def __init__(self,  access_key, secret_key, bucket, region, endpoint_url=None, location='', *args, **kwargs):
         self.bucket = bucket
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
+        self.endpoint_url = endpoint_url
+        self.location = location
         super(AWSDownload, self).__init__(*args, **kwargs)
 
-    def s3connect(self):
-        conn = boto.s3.connect_to_region(
-                self.region,
-                aws_access_key_id=self.access_key, 
-                aws_secret_access_key=self.secret_key,
-                is_secure=True,
-                calling_format=OrdinaryCallingFormat()
-            )
-        return conn
-
-    def get_bucket(self):
-        conn = self.s3connect()
-        bucket_name = self.bucket
-        bucket = conn.get_bucket(bucket_name)
-        return bucket
+    @classmethod
+    def from_settings(cls):
+        """ Returns a downloader for the storage bucket, None if files are not stored on S3 """
+        bucket = getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None)
+        if not bucket:
+            return None
+        return cls(
+            settings.AWS_ACCESS_KEY_ID,
+            settings.AWS_SECRET_ACCESS_KEY,
+            bucket,
+            getattr(settings, 'AWS_S3_REGION_NAME', None),
+            endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
+            location=getattr(settings, 'AWS_MEDIA_LOCATION', '')
+        )
 
-    def get_key(self, path):
-        bucket = self.get_bucket()
-        key = bucket.get_key(path)
-        return key
+    @property
+    def client(self):
+        return get_client(self.access_key, self.secret_key, self.region, self.endpoint_url)
 
     def get_filename(self, path, new_filename=None):
         '''
@@ -49,8 +85,8 @@ class AWSDownload(object):
         if new_filename is not None:
             filename, file_extension = os.path.splitext(current_filename)
             escaped_new_filename_base = re.sub(
-                                            '[^A-Za-z0-9\#]+', 
-                                            '-', 
+                                            '[^A-Za-z0-9\#]+',
+                                            '-',
                                             new_filename)
             escaped_filename = escaped_new_filename_base + file_extension
             return escaped_filename
@@ -58,21 +94,32 @@ class AWSDownload(object):
 
     def generate_url(self, path, download=True, new_filename=None):
         '''
-        This overrides the default method.
-        This was overriden so that the option to change the name of the file was available.
+        Returns a presigned GET url of the file at `path` in the bucket, with the option to change the name
+        of the downloaded file. Signing happens locally, the object is not looked up, so the url of a
+        missing file answers 404 when it is opened.
+        '''
+        key = '/'.join([self.location, path]) if self.location else path
+        params = {'Bucket': self.bucket, 'Key': key}
+        if download:
+            filename = self.get_filename(path, new_filename=new_filename)
+            params['ResponseContentType'] = 'application/force-download'
+            params['ResponseContentDisposition'] = 'attachment;filename="%s"' % filename
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params=params,
+            ExpiresIn=self.expires,
+            HttpMethod='GET'
+        )
+
+    def generate_urls(self, paths, download=True, new_filenames=None):
+        '''
+        Returns the presigned urls of many files at once, in the order of `paths`. `new_filenames` is an
+        optional list of names for the downloaded files.
         '''
-        file_url = None
-        aws_obj_key = self.get_key(path)
-        if aws_obj_key:
-            headers = None
-            if download:
-                filename = self.get_filename(path, new_filename=new_filename)
-                headers = {
-                    'response-content-type': 'application/force-download',
-                    'response-content-disposition':'attachment;filename="%s"'%filename
-                }
-            file_url = aws_obj_key.generate_url(
-                                response_headers=headers,
-                                 expires_in=self.expires, 
-                                method='GET') 
-        return file_url
+        paths = list(paths)
+        if new_filenames is None:
+            new_filenames = [None] * len(paths)
+        return [
+            self.generate_url(path, download=download, new_filename=new_filename)
+            for path, new_filename in zip(paths, new_filenames)
+        ]
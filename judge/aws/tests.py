@@ -0,0 +1,101 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from grader.models import Solution
+from questions.models import Question
+
+from .download.utils import AWSDownload
+
+
+User = get_user_model()
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    """ Serves the objects of FakeS3.objects by path, `/<bucket>/<key>`, when the url is presigned """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.requests.append(url)
+        body = self.server.objects.get(url.path)
+        if body is None or 'X-Amz-Signature' not in parse_qs(url.query):
+            self.send_response(404 if body is None else 403)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeS3(object):
+    """ A local stand-in for the S3 endpoint that records the requests it gets """
+
+    def __init__(self):
+        self.server = HTTPServer(('127.0.0.1', 0), FakeS3Handler)
+        self.server.objects = {}
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{port}'.format(port=self.server.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self.server
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class AWSDownloadTests(SimpleTestCase):
+
+    def setUp(self):
+        self.s3 = FakeS3()
+        self.download = AWSDownload('key', 'secret', 'bucket', 'ap-south-1', endpoint_url=self.s3.url,
+                                    location='media')
+
+    def test_client_is_shared(self):
+        other = AWSDownload('key', 'secret', 'other-bucket', 'ap-south-1', endpoint_url=self.s3.url)
+        self.assertIs(self.download.client, other.client)
+
+    def test_urls_are_presigned_without_requests(self):
+        with self.s3 as server:
+            server.objects['/bucket/media/submissions/alice/ADD.py'] = b'print(1)'
+            urls = self.download.generate_urls(
+                ['submissions/alice/ADD.py', 'submissions/alice/SUB.c'], new_filenames=['alice add', None]
+            )
+            self.assertEqual(server.requests, [])
+
+            self.assertIn('filename%3D%22alice-add.py%22', urls[0])
+            self.assertIn('filename%3D%22SUB.c%22', urls[1])
+            self.assertEqual(urlopen(urls[0]).read(), b'print(1)')
+            self.assertEqual([request.path for request in server.requests], ['/bucket/media/submissions/alice/ADD.py'])
+
+
+class PreviousSubmissionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', password='secret')
+        question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        Solution.objects.create(question=question, user=self.user, file='submissions/alice/ADD.py', language='py3')
+        self.client.force_login(self.user)
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_ACCESS_KEY_ID='key', AWS_SECRET_ACCESS_KEY='secret',
+                       AWS_S3_REGION_NAME='ap-south-1', AWS_S3_ENDPOINT_URL='http://127.0.0.1:9', AWS_MEDIA_LOCATION='media')
+    def test_links_are_presigned(self):
+        response = self.client.get(reverse('grader:previous_submissions', kwargs={'code': 'ADD'}))
+        self.assertContains(response, 'http://127.0.0.1:9/bucket/media/submissions/alice/ADD.py?')
+        self.assertContains(response, 'X-Amz-Signature=')
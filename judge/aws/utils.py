@@ -1,6 +1,7 @@
+from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
 
 
 # location of static and media inside bucket
 StaticRootS3BotoStorage = lambda: S3Boto3Storage(location='static')
-MediaRootS3BotoStorage = lambda: S3Boto3Storage(location='media')
+MediaRootS3BotoStorage = lambda: S3Boto3Storage(location=settings.AWS_MEDIA_LOCATION)
@@ -0,0 +1,49 @@
+"""
+Cached data of the most visited pages. Every entry belongs to a namespace whose version is part of the cache key,
+invalidating a namespace bumps the version so that all its entries are recomputed on the next request.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Seconds an entry stays cached. Entries are invalidated when their data changes, the timeout bounds how stale
+# they can get when the cache is not shared by all processes (e.g. the local memory cache).
+CACHE_TIMEOUT = getattr(settings, 'VIEW_CACHE_TIMEOUT', 300)
+
+
+def _version_key(namespace):
+    return 'version:' + namespace
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), repr(time.time()), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def invalidate(namespace):
+    cache.set(_version_key(namespace), repr(time.time()), None)
+
+
+def make_key(namespace, *parts):
+    return ':'.join([namespace, str(get_version(namespace))] + [str(part) for part in parts])
+
+
+def get_or_set(namespace, parts, compute, timeout=CACHE_TIMEOUT):
+    """ Returns the cached value of `parts` in `namespace`, calling `compute` if there is none. None is not cached. """
+    key = make_key(namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+    return value
+
+
+def user_namespace(username):
+    """ Namespace of the pages that show one user's data """
+    return 'user:' + username
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from decouple import config
 
 
@@ -102,6 +103,18 @@ DATABASES = {
 }
 
 
+# Cache
+# A file cache is shared by the web and grading processes of this machine, so a verdict invalidates the cached pages of
+# the web process right away.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'code-warrior', 'cache'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -0,0 +1,25 @@
+from django.db import connection
+from django.test import TestCase
+
+
+class QueryPlanTestCase(TestCase):
+    """ Checks that querysets are answered from indexes. Query plans are only inspected on SQLite. """
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are only checked on SQLite')
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, ordered=False):
+        """ Fails if a table is scanned without an index, or with ordered=True, if the rows are sorted afterwards """
+        plan = self.get_query_plan(queryset)
+        full_scans = [step for step in plan if step.startswith('SCAN') and 'USING' not in step]
+        self.assertEqual(full_scans, [], 'Full table scan in {plan}'.format(plan=plan))
+        if ordered:
+            sorts = [step for step in plan if 'TEMP B-TREE' in step]
+            self.assertEqual(sorts, [], 'Sort without an index in {plan}'.format(plan=plan))
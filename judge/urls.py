@@ -6,7 +6,8 @@ from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
 from .views import home, contact_page
-from accounts.views import RegisterView, ProfileView, LoginView, LeaderBoardView
+from accounts.views import RegisterView, ProfileView, LoginView, LeaderBoardView, MyRankView
+from grader.views import leaderboard_events
 
 
 urlpatterns = [
@@ -16,6 +17,8 @@ urlpatterns = [
     url(r'^logout/$', LogoutView.as_view(), name='logout'),
     url(r'^contact/$', contact_page, name='contact'),
     url(r'^leaderboard/$', LeaderBoardView.as_view(), name='leaderboard'),
+    url(r'^leaderboard/me/$', MyRankView.as_view(), name='leaderboard-me'),
+    url(r'^leaderboard/events/$', leaderboard_events, name='leaderboard-events'),
     url(r'^profile/(?P<username>[a-zA-Z0-9]+)/$', ProfileView.as_view(), name='profile'),
     url(r'^account/', include('accounts.urls', namespace='account')),
     url(r'^accounts/', include('accounts.passwords.urls')),
@@ -1,17 +1,18 @@
-import random
+import secrets
 import string
 
 
+# Length of activation keys, 40 characters out of 36 give about 206 random bits
+KEY_SIZE = 40
+
+
 def random_string_generator(size=10, chars=string.ascii_lowercase + string.digits):
-    return ''.join(random.choice(chars) for _ in range(size))
+    return ''.join(secrets.choice(chars) for _ in range(size))
 
 
 def unique_key_generator(instance):
-    size = random.randint(30, 45)
-    new_key = random_string_generator(size=size)
-
-    Klass = instance.__class__
-    qs_exists = Klass.objects.filter(key=new_key).exists()
-    if qs_exists:
-        return unique_key_generator(instance)
-    return new_key
+    """
+    Returns a random lower case key from the operating system's CSPRNG. A collision is too unlikely to be
+    worth a query, the unique index on the key column rejects one if it ever happens.
+    """
+    return random_string_generator(size=KEY_SIZE)
@@ -1,9 +1,9 @@
 from django.shortcuts import render
 from django.conf import settings
-from django.core.mail import send_mail
 from django.template.loader import get_template
 
 from .forms import ContactForm
+from accounts.models import OutboundEmail
 
 
 def home(request):
@@ -26,13 +26,12 @@ def contact_page(request):
         html_ = get_template('contact/message.html').render(data)
         from_email = 'Code Warrior <' + data.get('email') + '>'
         recipient_list = [x[1] for x in settings.MANAGERS]
-        send_mail(
+        OutboundEmail.objects.enqueue(
             subject,
             txt_,
             from_email,
             recipient_list,
-            html_message=html_,
-            fail_silently=False
+            html_message=html_
         )
     
     # if contact_form.errors:
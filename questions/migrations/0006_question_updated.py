@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_testcase_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='weight',
+            field=models.IntegerField(default=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:24
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_question_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='checker',
+            field=models.CharField(choices=[('exact', 'Exact'), ('whitespace', 'Ignore whitespace'), ('tokens', 'Tokens'), ('float', 'Floating point tokens')], default='whitespace', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='float_tolerance',
+            field=models.FloatField(default=1e-06),
+        ),
+    ]
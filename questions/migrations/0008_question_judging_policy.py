@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0007_question_checker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='judging_policy',
+            field=models.CharField(choices=[('full', 'Full'), ('fail_fast', 'Fail fast'), ('sample_first', 'Samples first')], default='full', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='is_sample',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_question_judging_policy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='memory_limit',
+            field=models.IntegerField(default=256),
+        ),
+    ]
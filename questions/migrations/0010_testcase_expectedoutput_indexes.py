@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_question_memory_limit'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expectedoutput',
+            index=models.Index(fields=['question', 'file'], name='questions_e_questio_60c579_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testcase',
+            index=models.Index(fields=['question', 'file'], name='questions_t_questio_ec83c9_idx'),
+        ),
+    ]
@@ -1,8 +1,18 @@
 import os
 
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
 
+from grader.checkers import CHECKER_TYPES
+from judge.cache import get_or_set, get_version, invalidate
+
+
+JUDGING_POLICY_TYPES = (
+    ('full', 'Full'),                    # Run every test case, partial scores
+    ('fail_fast', 'Fail fast'),          # Stop at the first test case that is not accepted
+    ('sample_first', 'Samples first'),   # Run the sample test cases first, stop if one of them fails
+)
 
 def upload_question_image_location(instance, filename):
     file, ext = os.path.splitext(filename)
@@ -10,13 +20,36 @@ def upload_question_image_location(instance, filename):
     return location
 
 
+# Version of the 'questions' cache namespace -> code -> pk of the questions looked up by this process. Saving or
+# deleting a question in any process changes the shared version, so a renamed or recreated question is looked up again.
+_question_ids = {}
+
+
 class QuestionManager(models.Manager):
 
     def get_by_code(self, code):
-        qs = self.get_queryset().filter(code=code)
-        if qs.count() == 1:
-            return qs.first()
-        return None
+        return self.get_queryset().filter(code=code).first()
+
+    def get_id_by_code(self, code):
+        """ Returns the pk of the question with the given code, None if there is none """
+        version = get_version('questions')
+        if version not in _question_ids:
+            _question_ids.clear()
+            _question_ids[version] = {}
+        ids = _question_ids[version]
+        if code not in ids:
+            pk = self.get_queryset().filter(code=code).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            ids[code] = pk
+        return ids[code]
+
+    def cached_list(self):
+        """ Returns all questions, cached until a question or test case is added, changed or deleted """
+        return get_or_set('questions', ['list'], lambda: list(self.get_queryset()))
+
+    def cached_by_code(self, code):
+        return get_or_set('questions', ['detail', code], lambda: self.get_by_code(code))
 
 
 class Question(models.Model):
@@ -24,7 +57,12 @@ class Question(models.Model):
     title = models.CharField(unique=True, max_length=120)
     description = models.ImageField(upload_to=upload_question_image_location)
     time_limit = models.IntegerField(default=1)
+    memory_limit = models.IntegerField(default=256)  # MB
+    checker = models.CharField(max_length=20, choices=CHECKER_TYPES, default='whitespace')
+    float_tolerance = models.FloatField(default=1e-6)  # used by the 'float' checker
+    judging_policy = models.CharField(max_length=20, choices=JUDGING_POLICY_TYPES, default='full')
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
 
     objects = QuestionManager()
 
@@ -46,7 +84,7 @@ def upload_test_case_file_location(instance, filename):
 class TestCaseQuerySet(models.query.QuerySet):
 
     def get_by_question(self, question_code):
-        return self.filter(question__code=question_code)
+        return self.filter(question_id=Question.objects.get_id_by_code(question_code))
 
 
 class TestCaseManager(models.Manager):
@@ -61,12 +99,18 @@ class TestCaseManager(models.Manager):
 class TestCase(models.Model):
     question = models.ForeignKey(Question)
     file = models.FileField(upload_to=upload_test_case_file_location)
+    weight = models.IntegerField(default=10)  # score awarded when the test case passes
+    is_sample = models.BooleanField(default=False)  # judged first by the 'sample_first' policy
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)  # invalidates the graders' local copies
 
     objects = TestCaseManager()
 
     class Meta:
         ordering = ['file']
+        indexes = [
+            models.Index(fields=['question', 'file']),
+        ]
 
     def __str__(self):
         return self.question.code + ' - ' + self.file.name.split('/')[-1]
@@ -85,7 +129,7 @@ def upload_expected_output_file_location(instance, filename):
 class ExpectedOutputQuerySet(models.query.QuerySet):
 
     def get_by_question(self, question_code):
-        return self.filter(question__code=question_code)
+        return self.filter(question_id=Question.objects.get_id_by_code(question_code))
 
     def get_by_question_test_case(self, question_code, test_case):
         return self.get_by_question(question_code).filter(test_case=test_case)
@@ -108,11 +152,15 @@ class ExpectedOutput(models.Model):
     test_case = models.ForeignKey(TestCase)
     file = models.FileField(upload_to=upload_expected_output_file_location)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)  # invalidates the graders' local copies
 
     objects = ExpectedOutputManager()
 
     class Meta:
         ordering = ['file']
+        indexes = [
+            models.Index(fields=['question', 'file']),
+        ]
 
     def __str__(self):
         return self.question.code + ' - ' + self.file.name.split('/')[-1] + ' - ' + self.test_case.file.name.split('/')[-1]
@@ -121,3 +169,12 @@ class ExpectedOutput(models.Model):
     def filename(self):
         """ Returns the name of the file without the preceding path """
         return self.file.name.split('/')[-1]
+
+
+def questions_changed_receiver(sender, instance, *args, **kwargs):
+    invalidate('questions')
+
+post_save.connect(questions_changed_receiver, sender=Question)
+post_delete.connect(questions_changed_receiver, sender=Question)
+post_save.connect(questions_changed_receiver, sender=TestCase)
+post_delete.connect(questions_changed_receiver, sender=TestCase)
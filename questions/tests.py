@@ -1,3 +1,68 @@
-from django.test import TestCase
+from django import test
 
-# Create your tests here.
+from judge.cache import invalidate
+from judge.testcases import QueryPlanTestCase
+
+from .models import ExpectedOutput, Question, TestCase
+
+
+class QueryPlanTests(QueryPlanTestCase):
+
+    def setUp(self):
+        super(QueryPlanTests, self).setUp()
+        Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+
+    def test_test_cases_of_question(self):
+        self.assertUsesIndex(TestCase.objects.get_by_question('ADD'), ordered=True)
+        self.assertUsesIndex(TestCase.objects.filter(question_id=1), ordered=True)
+
+    def test_expected_outputs_of_question(self):
+        self.assertUsesIndex(ExpectedOutput.objects.get_by_question('ADD'), ordered=True)
+        self.assertUsesIndex(ExpectedOutput.objects.get_by_question_test_case('ADD', 1))
+
+
+class QuestionCacheTests(test.TestCase):
+
+    def test_list_is_invalidated_when_a_question_changes(self):
+        Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        self.assertEqual([question.code for question in Question.objects.cached_list()], ['ADD'])
+        with self.assertNumQueries(0):
+            Question.objects.cached_list()
+
+        Question.objects.create(code='SUB', title='Subtraction', description='questions/SUB.png')
+        self.assertEqual(sorted(question.code for question in Question.objects.cached_list()), ['ADD', 'SUB'])
+
+    def test_detail_is_invalidated_when_a_question_changes(self):
+        question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        self.assertEqual(Question.objects.cached_by_code('ADD').title, 'Addition')
+        question.title = 'Sum'
+        question.save()
+        self.assertEqual(Question.objects.cached_by_code('ADD').title, 'Sum')
+
+
+class QuestionCodeTests(test.TestCase):
+
+    def test_get_by_code_is_one_query(self):
+        Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        with self.assertNumQueries(1):
+            self.assertEqual(Question.objects.get_by_code('ADD').code, 'ADD')
+        with self.assertNumQueries(1):
+            self.assertIsNone(Question.objects.get_by_code('SUB'))
+
+    def test_code_to_id_is_cached_until_a_question_changes(self):
+        question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        self.assertEqual(Question.objects.get_id_by_code('ADD'), question.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(Question.objects.get_id_by_code('ADD'), question.pk)
+
+        question.delete()
+        self.assertIsNone(Question.objects.get_id_by_code('ADD'))
+
+    def test_code_to_id_follows_changes_made_by_other_processes(self):
+        question = Question.objects.create(code='ADD', title='Addition', description='questions/ADD.png')
+        self.assertEqual(Question.objects.get_id_by_code('ADD'), question.pk)
+        # Another process renames the question, this one only sees the version of the shared cache change
+        Question.objects.filter(pk=question.pk).update(code='SUM')
+        invalidate('questions')
+        self.assertIsNone(Question.objects.get_id_by_code('ADD'))
+        self.assertEqual(Question.objects.get_id_by_code('SUM'), question.pk)
@@ -8,11 +8,11 @@ from datetime import timedelta
 from django.utils.timezone import localtime, now
 from django.views.generic import ListView, DetailView
 from django.http import Http404
-from django.db.models import Q, Max
 
 from .models import Question
+from judge.cache import get_or_set, user_namespace
 from judge.mixins import LoginRequiredMixin
-from grader.models import Solution
+from grader.models import BestScore
 from grader.util import start_time
 
 class QuestionListView(LoginRequiredMixin, ListView):
@@ -35,15 +35,13 @@ class QuestionListView(LoginRequiredMixin, ListView):
     
         if current_time <=start_time:
             self.template_name='home.html'
-        questions = Question.objects.all()
+        questions = Question.objects.cached_list()
         user = self.request.user
+        best_scores = get_or_set(user_namespace(user.username), ['best-scores'], lambda: dict(
+            BestScore.objects.filter(user=user).values_list('question_id', 'best_score')
+        ))
         for ques in questions:
-            marks = Solution.objects.filter(Q(user=user) & Q(
-                question=ques)).aggregate(Max('score'))
-            if marks['score__max'] is None:
-                ques.marks_obtained = 0
-            else:
-                ques.marks_obtained = marks['score__max']
+            ques.marks_obtained = best_scores.get(ques.pk, 0)
         return questions
 
 
@@ -53,7 +51,7 @@ class QuestionDetailView(LoginRequiredMixin, DetailView):
     def get_object(self, *args, **kwargs):
         request = self.request
         code = self.kwargs.get('code')
-        instance = Question.objects.get_by_code(code)
+        instance = Question.objects.cached_by_code(code)
         if instance is None:
             raise Http404('Question not found')
         return instance